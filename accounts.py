@@ -0,0 +1,208 @@
+"""Multiple eBay seller accounts with their own tokens, policies and call budgets
+
+ebay.yaml can list several accounts; each entry overrides the top-level
+settings (app keys are usually shared, tokens and policy IDs are not):
+
+    appid: ...
+    devid: ...
+    certid: ...
+    accounts:
+      - name: main
+        token: ...
+        refresh_token: ...          # optional, for OAuth user tokens
+        payment_policy_id: ...
+        return_policy_id: ...
+        fulfillment_policy_id: ...
+        daily_call_limit: 5000
+      - name: second
+        ...
+
+Without an accounts list the top-level settings are a single "default"
+account, so existing configs keep working. Every account's config carries
+its name, which is how its listings are tagged in the ledger. Each account gets its own
+pooled HTTP session, refreshes its own token before it expires, and stops
+taking work once today's Trading API call budget is spent. Calls made
+today are remembered in account_usage.json across runs.
+
+run_sharded() spreads jobs over all accounts in parallel.
+"""
+import base64
+import json
+import os
+import queue
+import threading
+import time
+import requests
+import lister
+import metrics
+from metrics import logger
+
+USAGE_FILE = 'account_usage.json'
+DEFAULT_DAILY_CALL_LIMIT = 5000  # eBay's default Trading API allowance
+TOKEN_REFRESH_MARGIN = 5 * 60  # Refresh OAuth tokens this long before they expire
+OAUTH_TOKEN_PATH = '/identity/v1/oauth2/token'
+
+_usage_lock = threading.Lock()
+
+def today():
+    return time.strftime('%Y-%m-%d', time.gmtime())  # eBay call limits reset daily (UTC here)
+
+def load_usage(path=USAGE_FILE):
+    try:
+        with open(path, 'r') as f:
+            usage = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return usage if usage.get('date') == today() else {}
+
+def save_usage(accounts, path=USAGE_FILE):
+    """Write today's call counts for every account"""
+    with _usage_lock:
+        usage = {'date': today(), 'calls': {account.name: account.calls_today for account in accounts}}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(usage, f)
+        os.replace(tmp_path, path)
+
+class Account:
+    """One seller account: config, connection pool, token and call budget"""
+
+    def __init__(self, name, config, calls_today=0, pool_size=4):
+        self.name = name
+        self.config = config
+        self.daily_call_limit = int(config.get('daily_call_limit', DEFAULT_DAILY_CALL_LIMIT))
+        self.calls_today = calls_today
+        self.lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def remaining_calls(self):
+        return max(0, self.daily_call_limit - self.calls_today)
+
+    def spend(self, calls=1):
+        """Reserve Trading API calls from today's budget; False if there aren't enough left"""
+        with self.lock:
+            if self.calls_today + calls > self.daily_call_limit:
+                return False
+            self.calls_today += calls
+        metrics.count('trading_calls_budgeted', calls, account=self.name)
+        metrics.gauge('account_calls_remaining', self.remaining_calls(), account=self.name)
+        return True
+
+    def token_expiring(self):
+        expires_at = self.config.get('token_expires_at')
+        return expires_at is not None and float(expires_at) - time.time() < TOKEN_REFRESH_MARGIN
+
+    def ensure_token(self):
+        """Refresh the OAuth user token if it is about to expire and a refresh token is configured"""
+        with self.lock:
+            if not self.token_expiring():
+                return
+            if not self.config.get('refresh_token'):
+                raise Exception(f"eBay token for account {self.name} has expired; run get_ebay_token.py")
+
+            auth = base64.b64encode(f"{self.config['appid']}:{self.config['certid']}".encode('ascii')).decode('ascii')
+            with metrics.span('oauth.refresh_token', account=self.name):
+                response = self.session.post(
+                    f'{lister.EBAY_API_ROOT}{OAUTH_TOKEN_PATH}',
+                    headers={
+                        'Authorization': f'Basic {auth}',
+                        'Content-Type': 'application/x-www-form-urlencoded'
+                    },
+                    data={
+                        'grant_type': 'refresh_token',
+                        'refresh_token': self.config['refresh_token'],
+                    }
+                )
+            data = response.json()
+            if 'access_token' not in data:
+                raise Exception(f"Token refresh for account {self.name} failed: "
+                                f"{data.get('error_description', response.status_code)}")
+            self.config['token'] = data['access_token']
+            self.config['token_expires_at'] = time.time() + int(data.get('expires_in', 7200))
+            logger.info(f"Refreshed eBay token for account {self.name}")
+
+    def close(self):
+        self.session.close()
+
+def load_accounts(config, usage_file=USAGE_FILE):
+    """Account objects for ebay.yaml (a single "default" account if it has no accounts list)"""
+    shared = {key: value for key, value in config.items() if key != 'accounts'}
+    entries = config.get('accounts') or [{}]
+    calls = load_usage(usage_file).get('calls', {})
+
+    accounts = []
+    for index, entry in enumerate(entries):
+        name = entry.get('name') or ('default' if not config.get('accounts') else f"account{index + 1}")
+        merged = dict(shared)
+        merged.update(entry)
+        merged['name'] = name
+        accounts.append(Account(name, merged, calls.get(name, 0)))
+    return accounts
+
+def find_account(accounts, name):
+    """Account by name; listings recorded without one (lister used without accounts.py) belong to the first account"""
+    for account in accounts:
+        if account.name == name:
+            return account
+    return accounts[0] if name is None else None
+
+def run_sharded(accounts, jobs, work, calls_per_job=1, workers_per_account=1, usage_file=USAGE_FILE):
+    """Run work(account, job) for every job, spread over all accounts in parallel
+
+    Each account's workers take jobs from a shared queue for as long as the
+    account has a valid token and budget for calls_per_job more calls, so
+    faster accounts take more jobs. An account whose token can't be
+    refreshed stops without taking jobs, leaving them to the others.
+    Returns (results as (account name, job, result or exception) tuples,
+    jobs no account could take).
+    """
+    pending = queue.Queue()
+    for job in jobs:
+        pending.put(job)
+    results = []
+    results_lock = threading.Lock()
+
+    def worker(account):
+        while True:
+            # Check the token before taking a job; a dead account would otherwise fail every job fast
+            try:
+                account.ensure_token()
+            except Exception as e:
+                logger.error(f"Account {account.name} stopped taking jobs: {str(e)}")
+                return
+            if not account.spend(calls_per_job):
+                logger.warning(f"Account {account.name} has used its {account.daily_call_limit} calls for today")
+                return
+            try:
+                job = pending.get_nowait()
+            except queue.Empty:
+                with account.lock:
+                    account.calls_today -= calls_per_job  # Reserved but not used
+                return
+            try:
+                result = work(account, job)
+                metrics.count('jobs_done', account=account.name)
+            except Exception as e:
+                result = e
+                metrics.count('jobs_failed', account=account.name)
+            with results_lock:
+                results.append((account.name, job, result))
+
+    threads = [threading.Thread(target=worker, args=(account,), name=f"account-{account.name}-{index}")
+               for account in accounts for index in range(workers_per_account)]
+    with metrics.span('accounts.run_sharded', accounts=len(accounts)):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    if usage_file:
+        save_usage(accounts, usage_file)
+
+    leftover = []
+    while not pending.empty():
+        leftover.append(pending.get_nowait())
+    return results, leftover
@@ -0,0 +1,311 @@
+"""Compressed archive of raw Amazon product pages
+
+Every page the scraper or the monitor loads is kept as raw HTML, so when
+Amazon changes its markup or extraction improves, products can be
+re-extracted from the archive instead of being fetched again.
+
+Pages are content-addressed (SHA-256 of the HTML, so an unchanged page is
+stored once) and compressed with zstd. Product pages share most of their
+markup, so a zstd dictionary trained on stored pages ("archive.py train")
+shrinks every page stored after it several times further than plain
+zstd. Training takes seconds to minutes, so it only runs on demand, never
+from store() in the middle of a scrape. An SQLite index maps ASIN and fetch time
+to the stored page.
+
+    page_archive/
+        index.db                 ASIN, fetched_at, url, source -> digest
+        dictionaries/<id>.dict   trained zstd dictionaries
+        objects/ab/cdef....zst   compressed pages
+
+Usage:
+    python archive.py stats
+    python archive.py train [--sample-mb 11]
+    python archive.py reextract --out products.parquet [--since 2026-01-01] [--asin B0...] [--workers 8]
+
+Environment variables:
+    AMZLISTER_ARCHIVE_DIR  archive directory (default "page_archive"); set
+                           to an empty string to stop archiving pages
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import metrics
+from metrics import logger
+
+ARCHIVE_DIR = os.environ.get('AMZLISTER_ARCHIVE_DIR', 'page_archive')
+COMPRESSION_LEVEL = 10
+DICTIONARY_SIZE = 112 * 1024
+TRAIN_SAMPLE_BYTES = 100 * DICTIONARY_SIZE  # Raw HTML from the newest pages used to train a dictionary
+TRAIN_SUGGEST_AFTER = 200  # "archive.py stats" suggests training once this many pages have no dictionary
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    asin TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    url TEXT,
+    source TEXT,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (asin, fetched_at)
+);
+CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages(fetched_at);
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    dict_id INTEGER NOT NULL,
+    raw_bytes INTEGER,
+    stored_bytes INTEGER
+);
+"""
+
+_archive = None  # Default archive, opened on first archive_page() call
+
+class PageArchive:
+    """Content-addressed, dictionary-compressed store of raw page HTML"""
+
+    def __init__(self, root=ARCHIVE_DIR, read_only=False):
+        import zstandard
+
+        self.zstd = zstandard
+        self.root = root
+        self.lock = threading.Lock()
+        if not read_only:
+            os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+            os.makedirs(os.path.join(root, 'dictionaries'), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        if not read_only:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+        self.dictionaries = {}  # dict_id -> ZstdCompressionDict
+        self.compressor = None
+        self.decompressors = {}
+        self.dict_id = self.latest_dictionary()
+
+    # Dictionaries
+
+    def dictionary_path(self, dict_id):
+        return os.path.join(self.root, 'dictionaries', f"{dict_id}.dict")
+
+    def latest_dictionary(self):
+        """ID of the newest trained dictionary, or 0 for none"""
+        try:
+            ids = [int(name.split('.')[0]) for name in os.listdir(os.path.join(self.root, 'dictionaries'))
+                   if name.endswith('.dict')]
+        except OSError:
+            return 0
+        return max(ids, default=0)
+
+    def dictionary(self, dict_id):
+        if dict_id not in self.dictionaries:
+            with open(self.dictionary_path(dict_id), 'rb') as f:
+                self.dictionaries[dict_id] = self.zstd.ZstdCompressionDict(f.read())
+        return self.dictionaries[dict_id]
+
+    def train_dictionary(self, sample_bytes=TRAIN_SAMPLE_BYTES, size=DICTIONARY_SIZE):
+        """Train a new dictionary on the most recent pages and use it from now on
+
+        Pages are taken newest first until sample_bytes of raw HTML, so
+        memory use doesn't depend on how large the archive or its pages are.
+        """
+        digests = []
+        total = 0
+        rows = self.db.execute("""
+            SELECT digest, raw_bytes FROM objects JOIN pages USING (digest)
+            GROUP BY digest ORDER BY MAX(fetched_at) DESC""")
+        for digest, raw_bytes in rows:
+            if digests and total + (raw_bytes or 0) > sample_bytes:
+                break
+            digests.append(digest)
+            total += raw_bytes or 0
+        samples = [self.load(digest).encode('utf-8') for digest in digests]
+        if len(samples) < 10:
+            raise Exception(f"Need at least 10 archived pages to train a dictionary, have {len(samples)}")
+
+        with metrics.span('archive.train_dictionary'):
+            trained = self.zstd.train_dictionary(size, samples, level=COMPRESSION_LEVEL)
+        with self.lock:
+            dict_id = self.latest_dictionary() + 1
+            with open(self.dictionary_path(dict_id), 'wb') as f:
+                f.write(trained.as_bytes())
+            self.dict_id = dict_id
+            self.compressor = None
+        logger.info(f"Trained archive dictionary {dict_id} on {len(samples)} pages ({total / 1048576:.1f} MB)")
+        return dict_id
+
+    # Pages
+
+    def object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:] + '.zst')
+
+    def store(self, asin, html, url=None, source='selenium', fetched_at=None):
+        """Archive one page; returns its digest (identical pages are stored once)"""
+        raw = html.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        fetched_at = fetched_at or time.time()
+
+        with self.lock, metrics.span('archive.store'):
+            known = self.db.execute("SELECT 1 FROM objects WHERE digest = ?", (digest,)).fetchone()
+            if not known:
+                if self.compressor is None:
+                    dict_data = self.dictionary(self.dict_id) if self.dict_id else None
+                    self.compressor = self.zstd.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dict_data)
+                compressed = self.compressor.compress(raw)
+                path = self.object_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+                metrics.count('archive_bytes', len(raw), kind='raw')
+                metrics.count('archive_bytes', len(compressed), kind='stored')
+            with self.db:
+                if not known:
+                    self.db.execute("INSERT INTO objects (digest, dict_id, raw_bytes, stored_bytes) VALUES (?, ?, ?, ?)",
+                                    (digest, self.dict_id, len(raw), len(compressed)))
+                self.db.execute("INSERT OR REPLACE INTO pages (asin, fetched_at, url, source, digest) "
+                                "VALUES (?, ?, ?, ?, ?)", (asin, fetched_at, url, source, digest))
+        return digest
+
+    def load(self, digest):
+        """The HTML stored under a digest"""
+        dict_id = self.db.execute("SELECT dict_id FROM objects WHERE digest = ?", (digest,)).fetchone()
+        if dict_id is None:
+            raise Exception(f"Page {digest} is not in the archive")
+        decompressor = self.decompressors.get(dict_id[0])
+        if decompressor is None:
+            dict_data = self.dictionary(dict_id[0]) if dict_id[0] else None
+            decompressor = self.zstd.ZstdDecompressor(dict_data=dict_data)
+            self.decompressors[dict_id[0]] = decompressor
+        with open(self.object_path(digest), 'rb') as f:
+            return decompressor.decompress(f.read()).decode('utf-8')
+
+    def pages(self, asins=None, since=None, until=None, latest_only=True):
+        """Index rows (asin, fetched_at, url, source, digest), optionally only each ASIN's newest page"""
+        conditions = []
+        params = []
+        if asins:
+            conditions.append(f"asin IN ({', '.join('?' * len(asins))})")
+            params.extend(asins)
+        if since is not None:
+            conditions.append("fetched_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("fetched_at < ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT asin, fetched_at, url, source, digest FROM pages{where}"
+        if latest_only:
+            query = (f"SELECT asin, MAX(fetched_at), url, source, digest FROM pages{where} GROUP BY asin")
+        return self.db.execute(query + " ORDER BY asin", params).fetchall()
+
+    def stats(self):
+        pages, asins = self.db.execute("SELECT COUNT(*), COUNT(DISTINCT asin) FROM pages").fetchone()
+        objects, raw, stored = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(stored_bytes), 0) FROM objects").fetchone()
+        return {'pages': pages, 'asins': asins, 'objects': objects, 'raw_bytes': raw, 'stored_bytes': stored,
+                'dictionary': self.dict_id}
+
+    def close(self):
+        self.db.close()
+
+def archive_page(asin, html, url=None, source='selenium'):
+    """Store a fetched page in the default archive; never raises"""
+    global _archive
+    if not ARCHIVE_DIR or not asin or not html:
+        return None
+    try:
+        if _archive is None:
+            _archive = PageArchive(ARCHIVE_DIR)
+        return _archive.store(asin, html, url, source)
+    except Exception as e:
+        logger.warning(f"Could not archive page for {asin}: {str(e)}")
+        return None
+
+# Re-extraction over a process pool
+
+_worker_archive = None
+
+def _init_worker(root):
+    global _worker_archive
+    _worker_archive = PageArchive(root, read_only=True)
+
+def _extract(row):
+    """Parse one archived page; returns (asin, fetched_at, url, product dict or None)"""
+    import lister
+
+    asin, fetched_at, url, _, digest = row
+    try:
+        product = lister.parse_product_html(_worker_archive.load(digest))
+    except Exception as e:
+        logger.warning(f"Re-extracting {asin} failed: {str(e)}")
+        product = None
+    return asin, fetched_at, url, product
+
+def reextract(root, rows, workers=None, chunksize=64):
+    """Run lister.parse_product_html over archived pages in parallel; return ProductRecords"""
+    from catalog import ProductRecord
+
+    records = []
+    failed = 0
+    with metrics.span('archive.reextract'), \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(root,)) as pool:
+        for asin, fetched_at, url, product in pool.map(_extract, rows, chunksize=chunksize):
+            if product is None:
+                failed += 1
+                continue
+            record = ProductRecord.from_product(product, url or "")
+            record.asin = record.asin or asin
+            record.scraped_at = fetched_at
+            records.append(record)
+    metrics.count('pages_reextracted', len(records))
+    if failed:
+        logger.warning(f"{failed} archived pages could not be parsed")
+    return records
+
+def parse_date(text):
+    return time.mktime(time.strptime(text, '%Y-%m-%d')) if text else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw product page archive")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help="Pages, ASINs and compression ratio")
+    train_parser = sub.add_parser('train', help="Train a new zstd dictionary on recent pages")
+    train_parser.add_argument('--sample-mb', type=float, default=TRAIN_SAMPLE_BYTES / 1048576,
+                              help="Raw HTML from the newest pages to train on")
+    extract_parser = sub.add_parser('reextract', help="Re-run extraction over archived pages")
+    extract_parser.add_argument('--out', required=True, help="Catalog file to write (.parquet, .arrow or .csv)")
+    extract_parser.add_argument('--asin', action='append', help="Only these ASINs (repeatable)")
+    extract_parser.add_argument('--since', help="Only pages fetched on or after YYYY-MM-DD")
+    extract_parser.add_argument('--until', help="Only pages fetched before YYYY-MM-DD")
+    extract_parser.add_argument('--all-versions', action='store_true', help="Every archived copy, not just the newest")
+    extract_parser.add_argument('--workers', type=int, default=None, help="Processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    metrics.setup_logging()
+    page_archive = PageArchive(ARCHIVE_DIR or 'page_archive')
+    if args.command == 'stats':
+        stats = page_archive.stats()
+        ratio = stats['raw_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0
+        print(f"{stats['pages']} pages of {stats['asins']} ASINs in {stats['objects']} objects")
+        print(f"{stats['raw_bytes'] / 1048576:.1f} MB raw, {stats['stored_bytes'] / 1048576:.1f} MB stored "
+              f"({ratio:.1f}x), dictionary {stats['dictionary'] or 'none'}")
+        if not stats['dictionary'] and stats['objects'] >= TRAIN_SUGGEST_AFTER:
+            print("Run 'python archive.py train' to compress new pages with a dictionary")
+    elif args.command == 'train':
+        print(f"Dictionary {page_archive.train_dictionary(int(args.sample_mb * 1048576))} trained")
+    else:
+        import catalog
+
+        rows = page_archive.pages(args.asin, parse_date(args.since), parse_date(args.until),
+                                  latest_only=not args.all_versions)
+        start = time.perf_counter()
+        records = reextract(page_archive.root, rows, args.workers)
+        elapsed = time.perf_counter() - start
+        written = catalog.write_catalog(records, args.out)
+        print(f"Re-extracted {len(records)} of {len(rows)} pages in {elapsed:.1f}s into {written}")
+    page_archive.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""Fill eBay item specifics from scraped Amazon product details
+
+eBay rejects or buries listings with wrong item specifics, so instead of
+sending the first allowed value for every required aspect, each aspect is
+matched against the product's detail bullets ("Manufacturer", "Color",
+"Item model number", ...) and title.
+
+Detail keys and values are normalized once (memoized), aspect name
+synonyms and each category's allowed-value table are built once per
+category, and matches on detail values are memoized per category, so
+filling a whole batch costs a few dictionary lookups per item and no API
+calls. Titles are unique per product, so they are matched without caching
+to keep memory flat over large batches.
+
+Required specifics come from lister.fetch_item_specifics as name ->
+{"mode", "values"}. SELECTION_ONLY aspects must take one of their values;
+FREE_TEXT aspects (Brand and most others) take the detail value as is,
+spelled like a suggested value when it matches one.
+
+Every filled aspect gets a confidence:
+    1.0   detail value matches an allowed value (or the aspect is free text)
+    0.8   an allowed value is contained in the detail value
+    0.6   an allowed value appears in the title
+    0.2   a catch-all value ("Unbranded", "Other", "Does Not Apply")
+    0.0   nothing matched; first allowed value or "Unspecified"
+"""
+import re
+from functools import lru_cache
+import metrics
+from metrics import logger
+
+# eBay aspect name -> Amazon detail keys that carry the same information (all normalized)
+SYNONYMS = {
+    "brand": ["brand", "brand name", "manufacturer"],
+    "color": ["color", "colour", "color name", "item color"],
+    "material": ["material", "material type", "frame material", "outer material", "fabric type"],
+    "model": ["model name", "model", "item model number", "model number"],
+    "mpn": ["manufacturer part number", "part number", "item model number", "model number"],
+    "size": ["size", "item size", "size name"],
+    "style": ["style", "style name"],
+    "type": ["item type", "type", "product type"],
+    "department": ["department"],
+    "pattern": ["pattern", "pattern name"],
+    "shape": ["shape", "item shape"],
+    "theme": ["theme"],
+    "number of items": ["number of items", "unit count", "number of pieces"],
+    "item weight": ["item weight"],
+    "item length": ["item length"],
+    "country/region of manufacture": ["country of origin"],
+    "upc": ["upc", "gtin"],
+    "power source": ["power source"],
+    "connectivity": ["connectivity technology", "connectivity"],
+    "capacity": ["capacity"],
+    "voltage": ["voltage"],
+    "features": ["special feature", "special features"],
+}
+
+# Values eBay accepts as "nothing better to say", best first
+CATCH_ALL_VALUES = ["unbranded", "does not apply", "other", "not applicable", "unknown"]
+
+SELECTION_ONLY = 'SELECTION_ONLY'
+FREE_TEXT = 'FREE_TEXT'
+
+FREE_TEXT_DEFAULTS = {"brand": "Unbranded"}  # When nothing matched and any value is allowed
+UNSPECIFIED = "Unspecified"
+
+def strip_marks(text):
+    """Remove the left-to-right/right-to-left marks Amazon pads detail text with"""
+    return text.replace("\u200e", "").replace("\u200f", "").strip()
+
+@lru_cache(maxsize=4096)
+def normalize_key(key):
+    """Canonical form of a detail key or aspect name: "Item Model Number " -> "item model number" """
+    key = strip_marks(key).lower()
+    return " ".join(re.sub(r"[^a-z0-9/ ]+", " ", key).split())
+
+def normalize_text(text):
+    """Canonical form of any text for comparison"""
+    text = strip_marks(text).lower()
+    return " ".join(re.sub(r"[^a-z0-9.]+", " ", text).split())
+
+@lru_cache(maxsize=65536)
+def normalize_value(value):
+    """normalize_text, memoized for detail and allowed values (which repeat across products)"""
+    return normalize_text(value)
+
+def find_value(text, allowed, by_length, contained_confidence):
+    """(allowed value, confidence) for normalized text, or None
+
+    An exact match scores 1.0; an allowed value contained in the text
+    scores contained_confidence.
+    """
+    if text in allowed:
+        return allowed[text], 1.0
+    padded = f" {text} "
+    for candidate in by_length:
+        if candidate and f" {candidate} " in padded:
+            return allowed[candidate], contained_confidence
+    return None
+
+def normalize_details(details):
+    """{normalized key: (original value, normalized value)} for a product's details"""
+    normalized = {}
+    for key, value in (details or {}).items():
+        if value:
+            normalized.setdefault(normalize_key(key), (strip_marks(value), normalize_value(value)))
+    return normalized
+
+class CategoryAspects:
+    """Synonym and allowed-value tables for one category's required aspects"""
+
+    def __init__(self, required_specifics):
+        self.aspects = []
+        for name, aspect in required_specifics.items():
+            closed = aspect.get("mode") == SELECTION_ONLY
+            values = aspect.get("values")
+            key = normalize_key(name)
+            # The aspect's own name first, then its synonyms
+            sources = [key] + [synonym for synonym in SYNONYMS.get(key, []) if synonym != key]
+            allowed = {}
+            for value in values or []:
+                allowed.setdefault(normalize_value(value), value)
+            # Longest first, so "navy blue" wins over "blue"
+            by_length = sorted(allowed, key=len, reverse=True)
+            self.aspects.append((name, key, sources, allowed, by_length, closed))
+        self.value_matches = {}  # (aspect key, normalized detail value) -> (value, confidence) or None
+
+    def match_value(self, key, text, allowed, by_length):
+        """Best allowed value for a normalized detail value, memoized per category"""
+        memo_key = (key, text)
+        if memo_key not in self.value_matches:
+            self.value_matches[memo_key] = find_value(text, allowed, by_length, 0.8)
+        return self.value_matches[memo_key]
+
+    def fill(self, details, title):
+        """(specifics, confidence, sources) for one product's normalized details and title"""
+        specifics = {}
+        confidence = {}
+        sources = {}
+        normalized_title = None  # Only normalized if some aspect needs it
+        for name, key, candidates, allowed, by_length, closed in self.aspects:
+            found = None
+            for source in candidates:
+                if source not in details:
+                    continue
+                value, normalized = details[source]
+                if not closed:
+                    # Free text: the detail value itself, spelled like a suggestion if it is one
+                    found = (allowed.get(normalized, value)[:65], 1.0, source)  # eBay caps values at 65 characters
+                    break
+                match = self.match_value(key, normalized, allowed, by_length)
+                if match:
+                    found = (match[0], match[1], source)
+                    break
+            if found is None and allowed:
+                if normalized_title is None:
+                    normalized_title = normalize_text(title or "")
+                match = find_value(normalized_title, allowed, by_length, 0.6)
+                if match:
+                    found = (match[0], 0.6, "title")
+            if found is None:
+                found = self.fallback(key, allowed, closed)
+            specifics[name], confidence[name], sources[name] = found
+        return specifics, confidence, sources
+
+    def fallback(self, key, allowed, closed):
+        for catch_all in CATCH_ALL_VALUES:
+            if catch_all in allowed:
+                return allowed[catch_all], 0.2, "default"
+        if closed and allowed:
+            return allowed[next(iter(allowed))], 0.0, "default"
+        if key in FREE_TEXT_DEFAULTS:
+            return FREE_TEXT_DEFAULTS[key], 0.2, "default"
+        return UNSPECIFIED, 0.0, "default"
+
+_categories = {}  # (category ID, aspect names) -> CategoryAspects
+
+def category_aspects(category_id, required_specifics):
+    """Memoized tables for a category"""
+    key = (str(category_id), tuple(required_specifics))  # The aspects a category requires don't change
+    tables = _categories.get(key)
+    if tables is None:
+        tables = _categories[key] = CategoryAspects(required_specifics)
+    return tables
+
+def fill_aspects(product, category_id, required_specifics):
+    """Item specifics for one product; returns a dict with specifics, confidence, sources and score
+
+    Brand is always sent (it is searchable even where it isn't required).
+    """
+    required = dict(required_specifics or {})
+    if not any(normalize_key(name) == "brand" for name in required):
+        required["Brand"] = {"mode": FREE_TEXT, "values": []}
+    tables = category_aspects(category_id, required)
+    specifics, confidence, sources = tables.fill(normalize_details(product.get("details")), product.get("title"))
+    score = sum(confidence.values()) / len(confidence) if confidence else 1.0
+    for source in sources.values():
+        metrics.count('aspects_filled', source='default' if source == 'default' else 'title' if source == 'title'
+                      else 'details')
+    return {"specifics": specifics, "confidence": confidence, "sources": sources, "score": round(score, 3)}
+
+def fill_batch(items):
+    """fill_aspects for (product, category ID, required specifics) tuples in one pass"""
+    with metrics.span('aspects.fill_batch', items=len(items)):
+        results = [fill_aspects(product, category_id, required) for product, category_id, required in items]
+    if results:
+        mean = sum(result["score"] for result in results) / len(results)
+        logger.info(f"Filled item specifics for {len(results)} products, mean confidence {mean:.2f}")
+    return results
@@ -0,0 +1,201 @@
+"""Unattended batch listing for products from already-mapped Amazon categories
+
+Reads Amazon product URLs (one per line), scrapes each one and looks up
+its browse node in the category mapping (category_map.py). Products from
+a known node are listed straight away with the remembered eBay category
+and item specifics - no Taxonomy calls, no clicks. Products from unknown
+nodes are written to an "unmapped" file to categorize once in the GUI.
+
+Scraped products can be saved to a catalog file (see catalog.py), and a
+catalog file can be given instead of a URL list to re-list products
+without scraping them again.
+
+Item specifics for every mapped product are filled in one pass from its
+Amazon details (see aspects.py); each product's match confidence goes to
+a report file so weak matches can be checked before eBay sees them.
+
+Listing is spread over every seller account in ebay.yaml (see
+accounts.py), in parallel, within each account's daily call budget.
+
+Usage:
+    python batch.py urls.txt [--unmapped unmapped.txt] [--dry-run] [--catalog products.parquet]
+                             [--aspects-report aspects_report.tsv]
+    python batch.py products.parquet        # re-list from a saved catalog
+"""
+import argparse
+import accounts
+import aspects
+import lister
+import metrics
+from browser import BrowserGovernor
+from catalog import ProductRecord, is_arrow_path, merge_catalog, read_catalog
+from metrics import logger
+
+UNMAPPED_FILE = 'unmapped.txt'
+ASPECTS_REPORT_FILE = 'aspects_report.tsv'
+LOW_CONFIDENCE = 0.5  # Aspects matched below this are listed in the report
+
+def read_urls(path):
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def open_dropbox(token_file='dropbox_token.txt'):
+    import dropbox
+
+    with open(token_file, 'r') as f:
+        return dropbox.Dropbox(f.read().strip())
+
+def categorize(browser, urls, unmapped_path=UNMAPPED_FILE, records=None):
+    """Scrape (or take from records) every product and pair the mapped ones with their category
+
+    Returns (jobs as (product, mapping) pairs, counts, newly scraped
+    ProductRecords). Products from unmapped nodes go to unmapped_path. An
+    ASIN that appears more than once is only kept once, since parallel
+    listing would otherwise post it twice before the ledger records it.
+    """
+    category_map = lister.get_category_map()
+    ledger = lister.get_ledger()
+    counts = {'duplicates': 0, 'unmapped': 0, 'failed': 0}
+    jobs = []
+    scraped = []
+    queued = set()  # ASINs already in jobs
+
+    with open(unmapped_path, 'a') as unmapped:
+        for source in (records if records is not None else urls):
+            url = source.url if records is not None else source
+            asin = source.asin if records is not None else lister.asin_from_url(url)
+            if asin and (ledger.is_listed(asin) or asin in queued):
+                counts['duplicates'] += 1
+                continue
+            try:
+                if records is not None:
+                    product = source
+                else:
+                    product = ProductRecord.from_product(browser.scrape(url), url)
+                    scraped.append(product)
+            except Exception as e:
+                logger.error(f"Batch item {url} failed: {str(e)}")
+                counts['failed'] += 1
+                continue
+            # Scraped products may have an ASIN the URL didn't show
+            if product.asin in queued:
+                counts['duplicates'] += 1
+                continue
+            mapping = category_map.lookup(product)
+            if mapping is None:
+                crumbs = " > ".join(crumb["name"] for crumb in product.get("breadcrumbs", []))
+                unmapped.write(f"{url}\t{crumbs or 'no breadcrumb'}\n")
+                counts['unmapped'] += 1
+                continue
+            jobs.append((product, mapping))
+            if product.asin:
+                queued.add(product.asin)
+    return jobs, counts, scraped
+
+def fill_jobs(jobs, report_path=ASPECTS_REPORT_FILE):
+    """Fill item specifics for every job in one pass; returns (product, mapping, fill) jobs
+
+    Jobs whose mapping predates stored specifics get a None fill and are
+    filled in list_job once the specifics are fetched. Writes each
+    product's confidence and its weakest aspects to report_path.
+    """
+    known = [(product, mapping) for product, mapping in jobs if mapping["required_specifics"] is not None]
+    fills = aspects.fill_batch([(product, mapping["category_id"], mapping["required_specifics"])
+                                for product, mapping in known])
+    by_product = {id(product): fill for (product, _), fill in zip(known, fills)}
+
+    with open(report_path, 'w') as report:
+        report.write("asin\turl\tcategory_id\tconfidence\tlow_confidence_aspects\n")
+        for (product, mapping), fill in zip(known, fills):
+            weak = [f"{name}={fill['specifics'][name]} ({score:.1f})"
+                    for name, score in fill["confidence"].items() if score < LOW_CONFIDENCE]
+            report.write(f"{product.get('asin', '')}\t{product.get('url', '')}\t{mapping['category_id']}\t"
+                         f"{fill['score']:.2f}\t{'; '.join(weak)}\n")
+    return [(product, mapping, by_product.get(id(product))) for product, mapping in jobs]
+
+def list_job(account, dbx, job):
+    """List one (product, mapping, fill) job on an account"""
+    product, mapping, fill = job
+    required_specifics = mapping["required_specifics"]
+    if required_specifics is None:
+        # Mapped before specifics were stored - fetch once and keep them
+        required_specifics = lister.fetch_item_specifics(account.config, mapping["category_id"])
+    item_id, _ = lister.list_product(account.config, dbx, product, mapping["category_id"], required_specifics,
+                                     session=account.session,
+                                     item_specifics=fill["specifics"] if fill else None)
+    lister.get_category_map().remember(product, mapping["category_id"], mapping["category_path"],
+                                       required_specifics)
+    return item_id
+
+def run_batch(accounts_list, dbx, jobs, workers_per_account=1):
+    """List jobs across all seller accounts in parallel; return (counts, jobs left over)"""
+    results, leftover = accounts.run_sharded(
+        accounts_list, jobs, lambda account, job: list_job(account, dbx, job),
+        workers_per_account=workers_per_account
+    )
+    counts = {'listed': 0, 'failed': 0, 'by_account': {account.name: 0 for account in accounts_list}}
+    for account_name, (product, _, _), result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Batch item {product.url or product.asin} failed on {account_name}: {str(result)}")
+            counts['failed'] += 1
+        else:
+            counts['listed'] += 1
+            counts['by_account'][account_name] += 1
+    return counts, leftover
+
+def main():
+    parser = argparse.ArgumentParser(description="List products from mapped Amazon categories without the GUI")
+    parser.add_argument('urls', help="File with one Amazon product URL per line, or a catalog file")
+    parser.add_argument('--unmapped', default=UNMAPPED_FILE, help="Where to write URLs with no category mapping")
+    parser.add_argument('--dry-run', action='store_true', help="Only scrape and categorize, don't list")
+    parser.add_argument('--catalog', help="Save scraped products to this catalog file (.parquet, .arrow or .csv)")
+    parser.add_argument('--workers-per-account', type=int, default=2, help="Parallel listings per seller account")
+    parser.add_argument('--aspects-report', default=ASPECTS_REPORT_FILE,
+                        help="Where to write each product's item specifics match confidence")
+    args = parser.parse_args()
+
+    metrics.setup_logging()
+    accounts_list = accounts.load_accounts(lister.load_config())
+    dbx = None if args.dry_run else open_dropbox()
+    records = None
+    if is_arrow_path(args.urls) or args.urls.lower().endswith('.csv'):
+        records = read_catalog(args.urls)
+
+    # Open shared state before the account threads start
+    lister.get_ledger()
+    category_map = lister.get_category_map()
+
+    browser = BrowserGovernor()
+    try:
+        jobs, counts, scraped = categorize(browser, read_urls(args.urls) if records is None else [],
+                                           args.unmapped, records)
+    finally:
+        browser.close()
+    if args.catalog and scraped:
+        merge_catalog(args.catalog, scraped)
+    jobs = fill_jobs(jobs, args.aspects_report)
+
+    listed = {'listed': 0, 'failed': 0, 'by_account': {}}
+    leftover = []
+    try:
+        if not args.dry_run:
+            listed, leftover = run_batch(accounts_list, dbx, jobs, args.workers_per_account)
+    finally:
+        metrics.export_prometheus()
+
+    print(f"{listed['listed']} listed, {counts['duplicates']} already listed, "
+          f"{counts['unmapped']} unmapped (see {args.unmapped}), {counts['failed'] + listed['failed']} failed")
+    for name, n in listed['by_account'].items():
+        print(f"  {name}: {n} listed")
+    if leftover:
+        print(f"{len(leftover)} products not listed: no account could take them (call budgets used up or "
+              f"tokens expired)")
+    print(f"Category mapping hit rate: {category_map.hit_rate():.1%}")
+    filled = [fill for _, _, fill in jobs if fill]
+    if filled:
+        weak = sum(1 for fill in filled if fill["score"] < LOW_CONFIDENCE)
+        print(f"Item specifics confidence: mean {sum(fill['score'] for fill in filled) / len(filled):.2f}, "
+              f"{weak} products below {LOW_CONFIDENCE} (see {args.aspects_report})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Catalog memory and import/export benchmark
+
+Builds N synthetic scraped products (as plain dicts and as ProductRecords),
+compares their memory footprint, then times writing and reading the
+catalog as Parquet (if pyarrow is installed) and CSV, including the
+two-column read repricer.py --catalog does.
+
+Usage:
+    python benchmarks/bench_catalog.py --products 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import catalog
+from fake_services import CATEGORY_TREE, asin_for, product_fields
+
+def synthetic_product(index):
+    """A dict shaped like lister.scrape_product's output"""
+    p = product_fields(asin_for(index))
+    parent_id = next(cid for cid, (_, children) in CATEGORY_TREE.items() if p['node'] in children)
+    return {
+        "title": p['title'],
+        "price": f"{p['whole'].replace(',', '')}.{p['fraction']}",
+        "description": f"A fake product used for offline benchmarks. Color: {p['color']}.",
+        # Built per product, as the scraper does, so keys start out as separate strings
+        "details": {
+            "".join(["Product ", "Dimensions"]): f"{p['dims']} inches; {p['weight']} Pounds",
+            "".join(["Col", "or"]): p['color'],
+            "".join(["Mate", "rial"]): "Stainless Steel",
+            "".join(["Manu", "facturer"]): "Fake Goods Co",
+            "".join(["AS", "IN"]): p['asin'],
+        },
+        "images": [f"https://m.media-amazon.com/images/I/{p['asin']}-{i}._AC_SL1500_.jpg" for i in range(p['images'])],
+        "availability": "In Stock",
+        "breadcrumbs": [
+            {"name": CATEGORY_TREE[parent_id][0], "node": parent_id},
+            {"name": CATEGORY_TREE[p['node']][0], "node": p['node']},
+        ],
+    }
+
+def measure(build):
+    """(result, traced bytes) for a function that builds something in memory"""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+def timed(label, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    print(f"{label:40} {time.perf_counter() - start:8.2f}s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog memory and import/export benchmark")
+    parser.add_argument('--products', type=int, default=100000)
+    args = parser.parse_args()
+
+    products, dict_bytes = measure(lambda: [synthetic_product(i) for i in range(args.products)])
+    del products
+    records, record_bytes = measure(lambda: [catalog.ProductRecord.from_product(synthetic_product(i))
+                                             for i in range(args.products)])
+    print(f"{args.products} products: dicts {dict_bytes / 1048576:.1f} MB, "
+          f"records {record_bytes / 1048576:.1f} MB")
+
+    formats = ['.csv']
+    try:
+        import pyarrow  # noqa: F401
+        formats.insert(0, '.parquet')
+    except ImportError:
+        print("pyarrow not installed; CSV only")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for suffix in formats:
+            path = os.path.join(tmp_dir, 'catalog' + suffix)
+            timed(f"write {suffix}", catalog.write_catalog, records, path)
+            print(f"{'  size':40} {os.path.getsize(path) / 1048576:8.1f} MB")
+            loaded = timed(f"read {suffix}", catalog.read_catalog, path)
+            assert len(loaded) == len(records)
+            timed(f"read {suffix} asin+price only", catalog.read_columns, path, ['asin', 'price'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Offline scrape -> upload -> list benchmark
+
+Starts the local stand-ins from fake_services.py, then runs the real
+lister.scrape_product (headless Chrome against static product pages) and
+lister.list_product (image download, Dropbox upload, Trading AddItem) for
+N fake products. Reports items/hour, p50/p99 per stage and peak memory.
+
+Usage:
+    python benchmarks/bench_pipeline.py --items 50
+    python benchmarks/bench_pipeline.py --items 200 --dropbox-latency 0.15 --trading-error-rate 0.02 --json report.json
+
+Needs Chrome and a chromedriver (./chromedriver, or --chromedriver PATH,
+or Selenium Manager when neither exists). No network access is used.
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import archive
+import lister
+import metrics
+from browser import BrowserGovernor, MAX_PAGES, MAX_RSS_MB
+from ledger import Ledger
+from fake_services import FakeServices, LocalDropbox, ServiceProfile, FAKE_CONFIG, asin_for
+
+STAGES = ['scrape_product', 'upload_to_dropbox', 'post_to_ebay', 'selenium.get', 'image.download',
+          'dropbox.files_upload', 'trading.AddItem', 'taxonomy.get_item_aspects_for_category', 'archive.store']
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def profiles_from_args(args):
+    return {
+        service: ServiceProfile(
+            latency=getattr(args, f'{service}_latency'),
+            jitter=getattr(args, f'{service}_latency') * args.jitter,
+            error_rate=getattr(args, f'{service}_error_rate'),
+        )
+        for service in ('amazon', 'taxonomy', 'trading', 'dropbox')
+    }
+
+def run(args):
+    durations = defaultdict(list)
+    metrics.add_listener(lambda sp: durations[sp.name].append(sp.duration))
+
+    with FakeServices(profiles_from_args(args), image_bytes=args.image_bytes, seed=args.seed) as services:
+        lister.EBAY_API_ROOT = services.url
+        dbx = LocalDropbox(services.url)
+        config = dict(FAKE_CONFIG)
+
+        driver_path = args.chromedriver
+        if driver_path is None and os.path.exists(lister.CHROMEDRIVER_PATH):
+            driver_path = lister.CHROMEDRIVER_PATH
+        browser = BrowserGovernor(driver_path, max_pages=args.max_pages, max_rss_mb=args.max_rss_mb,
+                                  block_resources=not args.no_block)
+        browser_peak = 0
+
+        tracemalloc.start()
+        listed = failed = 0
+        errors = defaultdict(int)
+        start = time.perf_counter()
+        try:
+            for index in range(args.items):
+                try:
+                    product = browser.scrape(services.product_url(asin_for(index)))
+                    browser_peak = max(browser_peak, browser.last_rss or 0)
+                    required = lister.fetch_item_specifics(config, args.category_id)
+                    item_id, _ = lister.list_product(config, dbx, product, args.category_id, required,
+                                                     require_https=False)
+                    listed += 1
+                except Exception as e:
+                    failed += 1
+                    errors[str(e).splitlines()[0][:80]] += 1
+        finally:
+            elapsed = time.perf_counter() - start
+            _, python_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            browser.close()
+
+        calls = dict(services.calls)
+
+    report = {
+        'items': args.items,
+        'listed': listed,
+        'failed': failed,
+        'elapsed_seconds': round(elapsed, 3),
+        'items_per_hour': round(listed / elapsed * 3600, 1) if elapsed else None,
+        'stages': {
+            name: {
+                'count': len(durations[name]),
+                'p50_ms': round(percentile(durations[name], 50) * 1000, 2),
+                'p99_ms': round(percentile(durations[name], 99) * 1000, 2),
+            }
+            for name in STAGES if durations[name]
+        },
+        'peak_python_heap_mb': round(python_peak / (1024 * 1024), 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_browser_rss_mb': round(browser_peak / (1024 * 1024), 1),
+        'browser_restarts': browser.restarts,
+        'errors': dict(errors),
+        'service_calls': calls,
+    }
+    return report
+
+def print_report(report):
+    print(f"Listed {report['listed']}/{report['items']} items in {report['elapsed_seconds']:.1f}s "
+          f"({report['items_per_hour']} items/hour), {report['failed']} failed")
+    print(f"{'stage':40} {'count':>6} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, stats in report['stages'].items():
+        print(f"{name:40} {stats['count']:>6} {stats['p50_ms']:>10.1f} {stats['p99_ms']:>10.1f}")
+    print(f"Peak Python heap: {report['peak_python_heap_mb']} MB, peak RSS: {report['peak_rss_mb']} MB")
+    print(f"Peak Chrome RSS: {report['peak_browser_rss_mb']} MB, {report['browser_restarts']} browser restarts")
+    for message, n in report['errors'].items():
+        print(f"  {n} x {message}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scrape/upload/list benchmark")
+    parser.add_argument('--items', type=int, default=50)
+    parser.add_argument('--category-id', default='1001')
+    parser.add_argument('--chromedriver', default=None)
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES, help="Recycle Chrome after this many pages")
+    parser.add_argument('--max-rss-mb', type=int, default=MAX_RSS_MB, help="Recycle Chrome above this RSS")
+    parser.add_argument('--no-block', action='store_true', help="Load images, fonts and media as well")
+    parser.add_argument('--image-bytes', type=int, default=150_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jitter', type=float, default=0.2, help="Latency jitter as a fraction of latency")
+    for service, latency in (('amazon', 0.05), ('taxonomy', 0.08), ('trading', 0.4), ('dropbox', 0.15)):
+        parser.add_argument(f'--{service}-latency', type=float, default=latency)
+        parser.add_argument(f'--{service}-error-rate', type=float, default=0.0)
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args()
+
+    # Keep the benchmark's own metrics, listings and pages out of the app's files
+    metrics.METRICS_DIR = ''
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        archive.ARCHIVE_DIR = os.path.join(tmp_dir, 'page_archive')
+        lister.set_ledger(Ledger(os.path.join(tmp_dir, 'ledger.db')))
+        try:
+            report = run(args)
+        finally:
+            lister.get_ledger().close()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Offline full-catalog repricing benchmark
+
+Builds a synthetic catalog, moves a fraction of the Amazon prices, and runs
+repricer.reprice against the fake Trading API from fake_services.py.
+
+Usage:
+    python benchmarks/bench_reprice.py --listings 100000 --changed 0.1 --trading-latency 0.4 --workers 8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import lister
+import metrics
+import repricer
+from fake_services import FakeServices, ServiceProfile, FAKE_CONFIG
+
+def synthetic_listings(count, changed_fraction, seed):
+    """Listings priced at the markdown, with changed_fraction of Amazon prices moved since"""
+    rng = random.Random(seed)
+    listings = []
+    for index in range(count):
+        amazon_price = round(rng.uniform(5, 250), 2)
+        price = round(amazon_price * lister.PRICE_MARKDOWN, 2)
+        if rng.random() < changed_fraction:
+            amazon_price = round(amazon_price * rng.uniform(0.8, 1.2), 2)
+        listings.append({
+            "asin": f"B0{index:08d}",
+            "sku": f"B0{index:08d}",
+            "item_id": str(110000000000 + index),
+            "amazon_price": amazon_price,
+            "price": price,
+            "quantity": 1,
+        })
+    return listings
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline repricing benchmark")
+    parser.add_argument('--listings', type=int, default=20000)
+    parser.add_argument('--changed', type=float, default=0.1, help="Fraction of Amazon prices that moved")
+    parser.add_argument('--workers', type=int, default=repricer.DEFAULT_WORKERS)
+    parser.add_argument('--trading-latency', type=float, default=0.4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    metrics.METRICS_DIR = ''
+    listings = synthetic_listings(args.listings, args.changed, args.seed)
+    profiles = {'trading': ServiceProfile(latency=args.trading_latency, jitter=args.trading_latency * 0.2)}
+
+    with FakeServices(profiles, image_bytes=0, seed=args.seed) as services:
+        lister.EBAY_API_ROOT = services.url
+        start = time.perf_counter()
+        changed, revised = repricer.reprice(FAKE_CONFIG, listings, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        calls = services.calls['POST ReviseInventoryStatus']
+
+    compute = metrics.snapshot()['spans']['reprice.compute']['seconds']
+    print(f"Catalog: {args.listings} listings, {changed} changed, {revised} revised")
+    print(f"Price computation: {compute * 1000:.1f} ms")
+    print(f"ReviseInventoryStatus calls: {calls} ({changed / max(calls, 1):.2f} items/call)")
+    print(f"Total: {elapsed:.1f}s with {args.workers} workers at {args.trading_latency * 1000:.0f} ms/call")
+
+if __name__ == '__main__':
+    main()
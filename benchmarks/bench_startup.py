@@ -0,0 +1,82 @@
+"""Startup-time benchmark for main.py
+
+Measures, in a fresh interpreter per run, how long it takes to import main.py
+and how long until the main window receives its first paint event.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--target 1.0]
+
+Runs offscreen by default (QT_QPA_PLATFORM=offscreen) so it works on a
+headless box. Exits non-zero if the median time to first paint is over target.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a child interpreter so every run is a cold import
+CHILD_SCRIPT = r'''
+import json, os, sys, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter()
+from PyQt6.QtCore import QObject, QEvent
+from PyQt6.QtWidgets import QApplication
+
+app = QApplication(sys.argv)
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            t_paint = time.perf_counter()
+            print(json.dumps({"import": t_import - t0, "first_paint": t_paint - t0}), flush=True)
+            os._exit(0)
+        return False
+
+window = main.AmazonEbayScraper()
+paint_filter = FirstPaint()
+window.installEventFilter(paint_filter)
+window.show()
+app.exec()
+'''
+
+def run_once():
+    """Start a child interpreter and return its import/first-paint timings"""
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(f"Startup run failed:\n{result.stderr}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure main.py cold start time")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--target', type=float, default=1.0, help="First-paint target in seconds")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    import_times = [r['import'] for r in runs]
+    paint_times = [r['first_paint'] for r in runs]
+
+    print(f"Runs: {args.runs}")
+    print(f"Import main.py:  median {statistics.median(import_times) * 1000:.0f} ms, "
+          f"max {max(import_times) * 1000:.0f} ms")
+    print(f"First paint:     median {statistics.median(paint_times) * 1000:.0f} ms, "
+          f"max {max(paint_times) * 1000:.0f} ms")
+
+    if statistics.median(paint_times) > args.target:
+        print(f"FAIL: median first paint is over the {args.target:.2f}s target")
+        sys.exit(1)
+    print(f"OK: under the {args.target:.2f}s target")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,417 @@
+"""Local HTTP stand-ins for Amazon, the eBay Taxonomy/Trading APIs and Dropbox
+
+One threaded HTTP server answers all four services on different path
+prefixes, each with its own latency and error rate:
+
+    amazon    GET  /dp/<ASIN>, GET /images/I/<name>
+    taxonomy  GET  /commerce/taxonomy/v1/...
+    trading   POST /ws/api.dll
+    dropbox   POST /2/files/..., /2/sharing/..., GET/HEAD /dropbox-files/...
+
+Point lister.EBAY_API_ROOT at FakeServices.url and use LocalDropbox in place
+of dropbox.Dropbox. Every request is counted in FakeServices.calls.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+EBAY_NS = 'urn:ebay:apis:eBLBaseComponents'
+
+class ServiceProfile:
+    """Latency (seconds, +/- jitter) and failure rate for one fake service"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+# A small category tree: two top-level categories, each with leaf children
+CATEGORY_TREE = {
+    '1000': ('Home & Garden', ['1001', '1002']),
+    '1001': ('Kitchen Tools', []),
+    '1002': ('Storage', []),
+    '2000': ('Electronics', ['2001', '2002']),
+    '2001': ('Cables', []),
+    '2002': ('Chargers', []),
+}
+ROOT_CATEGORIES = ['1000', '2000']
+
+ITEM_ASPECTS = [
+    {'localizedAspectName': 'Brand', 'aspectConstraint': {'aspectRequired': True, 'aspectMode': 'FREE_TEXT'},
+     'aspectValues': [{'localizedValue': 'Unbranded'}, {'localizedValue': 'Acme'}]},
+    {'localizedAspectName': 'Type', 'aspectConstraint': {'aspectRequired': True, 'aspectMode': 'SELECTION_ONLY'},
+     'aspectValues': [{'localizedValue': 'Other'}, {'localizedValue': 'Organizer'}]},
+    {'localizedAspectName': 'Color', 'aspectConstraint': {'aspectRequired': True, 'aspectMode': 'FREE_TEXT'},
+     'aspectValues': [{'localizedValue': 'Black'}, {'localizedValue': 'White'}, {'localizedValue': 'Blue'}]},
+    {'localizedAspectName': 'Material', 'aspectConstraint': {'aspectRequired': False, 'aspectMode': 'FREE_TEXT'},
+     'aspectValues': []},
+]
+
+def asin_for(index):
+    """Deterministic fake ASIN for the n-th product"""
+    return f"B0{index:08d}"
+
+def product_fields(asin):
+    """Deterministic title/price/details for a fake product page"""
+    rng = random.Random(asin)
+    dollars = rng.randint(5, 250)
+    cents = rng.randint(0, 99)
+    return {
+        'asin': asin,
+        'title': f"Fake Product {asin} Stainless Organizer Set",
+        'whole': f"{dollars:,}",
+        'fraction': f"{cents:02d}",
+        'color': rng.choice(['Black', 'White', 'Blue']),
+        'weight': f"{rng.uniform(0.2, 9.0):.2f}",
+        'dims': f"{rng.uniform(2, 20):.2f} x {rng.uniform(2, 20):.2f} x {rng.uniform(1, 10):.2f}",
+        'images': rng.randint(2, 7),
+        'node': rng.choice(['1001', '1002', '2001', '2002']),
+    }
+
+def product_page(asin, host):
+    """Render a static page with the element IDs and classes scrape_product reads"""
+    p = product_fields(asin)
+    node_name = CATEGORY_TREE[p['node']][0]
+    parent_id = next(cid for cid, (_, children) in CATEGORY_TREE.items() if p['node'] in children)
+    alt_images = "\n".join(
+        f'<li><img class="a-dynamic-image" src="http://{host}/images/I/{asin}-{i}._AC_US40_.jpg"></li>'
+        for i in range(1, p['images'])
+    )
+    return f"""<!DOCTYPE html>
+<html><head><title>Amazon.com: {p['title']}</title></head>
+<body>
+<div id="wayfinding-breadcrumbs_feature_div"><ul>
+  <li><a class="a-link-normal" href="/b/ref=dp_bc_1?node={parent_id}">{CATEGORY_TREE[parent_id][0]}</a></li>
+  <li><a class="a-link-normal" href="/b/ref=dp_bc_2?node={p['node']}">{node_name}</a></li>
+</ul></div>
+<span id="productTitle">  {p['title']}  </span>
+<div id="corePrice_feature_div">
+  <span class="a-price"><span class="a-offscreen">${p['whole']}.{p['fraction']}</span>
+  <span class="a-price-whole">{p['whole']}<span class="a-price-decimal">.</span></span><span class="a-price-fraction">{p['fraction']}</span></span>
+</div>
+<div id="availability"><span>In Stock</span></div>
+<div id="productDescription"><p>A fake product used for offline benchmarks. Color: {p['color']}.</p></div>
+<div id="feature-bullets"><ul><li>Durable</li><li>Easy to clean</li></ul></div>
+<div id="imgTagWrapperId"><img id="landingImage" src="http://{host}/images/I/{asin}-0._AC_SX300_.jpg"></div>
+<div id="altImages"><ul>
+{alt_images}
+<li><img class="a-dynamic-image" src="http://{host}/images/G/sprite._CB1_.png"></li>
+</ul></div>
+<div id="detailBullets_feature_div"><ul>
+  <li><span>Product Dimensions : {p['dims']} inches; {p['weight']} Pounds</span></li>
+  <li><span>Item model number : FK-{asin[-4:]}</span></li>
+  <li><span>Color : {p['color']}</span></li>
+  <li><span>Material : Stainless Steel</span></li>
+  <li><span>Manufacturer : FakeCo</span></li>
+  <li><span>ASIN : {asin}</span></li>
+</ul></div>
+</body></html>"""
+
+def trading_response(call_name, ack, body=''):
+    """Namespaced Trading API response envelope"""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<{call_name}Response xmlns="{EBAY_NS}">
+  <Timestamp>{time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())}</Timestamp>
+  <Ack>{ack}</Ack>
+  <Version>1399</Version>{body}
+</{call_name}Response>"""
+
+class FakeServices:
+    """Run the stand-in services on a local port until stop() is called"""
+
+    def __init__(self, profiles=None, image_bytes=150_000, seed=0, port=0):
+        self.profiles = {name: ServiceProfile() for name in ('amazon', 'taxonomy', 'trading', 'dropbox')}
+        self.profiles.update(profiles or {})
+        self.image = b'\xff\xd8\xff\xe0' + os.urandom(image_bytes)
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.calls = Counter()
+        self.files = {}  # Dropbox path -> bytes
+        self.next_item_id = 110000000000
+        self.items = {}  # ItemID -> {"sku", "price", "quantity"}
+        self.lock = threading.Lock()
+
+        handler = type('Handler', (FakeHandler,), {'services': self})
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.server.daemon_threads = True
+        self.host = f"127.0.0.1:{self.server.server_address[1]}"
+        self.url = f"http://{self.host}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def product_url(self, asin):
+        return f"{self.url}/dp/{asin}"
+
+    def delay(self, service):
+        """Sleep for the service's latency; return True if this call should fail"""
+        profile = self.profiles[service]
+        with self.rng_lock:
+            pause = profile.latency + self.rng.uniform(-profile.jitter, profile.jitter)
+            fail = self.rng.random() < profile.error_rate
+        if pause > 0:
+            time.sleep(pause)
+        return fail
+
+class FakeHandler(BaseHTTPRequestHandler):
+    services = None  # Set on the per-server subclass
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def send(self, status, body=b'', content_type='application/json', head=False):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def send_json(self, status, data):
+        self.send(status, json.dumps(data))
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def route(self, path):
+        if path.startswith('/commerce/taxonomy/'):
+            return 'taxonomy'
+        if path.startswith('/ws/api.dll'):
+            return 'trading'
+        if path.startswith('/2/') or path.startswith('/dropbox-files/'):
+            return 'dropbox'
+        return 'amazon'
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        services = self.services
+        url = urlparse(self.path)
+        service = self.route(url.path)
+        services.calls[f"{self.command} {url.path.rsplit('/', 1)[0] if service == 'amazon' else url.path}"] += 1
+        if services.delay(service):
+            return self.send(500, '{"error": "injected failure"}', head=head)
+
+        if url.path.startswith('/dp/'):
+            asin = url.path.split('/')[2]
+            return self.send(200, product_page(asin, services.host), 'text/html; charset=utf-8', head)
+        if url.path.startswith('/images/'):
+            return self.send(200, services.image, 'image/jpeg', head)
+        if url.path.startswith('/dropbox-files/'):
+            data = services.files.get(url.path[len('/dropbox-files'):])
+            if data is None:
+                return self.send(404, head=head)
+            return self.send(200, data, 'image/jpeg', head)
+        if service == 'taxonomy':
+            return self.taxonomy(url)
+        self.send(404, head=head)
+
+    def taxonomy(self, url):
+        query = parse_qs(url.query)
+
+        def node(category_id):
+            name, children = CATEGORY_TREE[category_id]
+            return {
+                'category': {'categoryId': category_id, 'categoryName': name},
+                'leafCategoryTreeNode': not children,
+                'childCategoryTreeNodes': [node(child) for child in children],
+            }
+
+        if url.path.endswith('/get_default_category_tree_id'):
+            return self.send_json(200, {'categoryTreeId': '0', 'categoryTreeVersion': '1'})
+        if url.path.endswith('/get_category_subtree'):
+            category_id = query.get('category_id', [''])[0]
+            if category_id not in CATEGORY_TREE:
+                return self.send_json(404, {'errors': [{'message': 'Unknown category'}]})
+            return self.send_json(200, {'categorySubtreeNode': node(category_id)})
+        if url.path.endswith('/get_item_aspects_for_category'):
+            return self.send_json(200, {'aspects': ITEM_ASPECTS})
+        if url.path.startswith('/commerce/taxonomy/v1/category_tree/'):
+            root = {'category': {'categoryId': '0', 'categoryName': 'Root'},
+                    'childCategoryTreeNodes': [node(cid) for cid in ROOT_CATEGORIES]}
+            return self.send_json(200, {'categoryTreeId': '0', 'rootCategoryNode': root})
+        self.send(404)
+
+    def do_POST(self):
+        services = self.services
+        url = urlparse(self.path)
+        service = self.route(url.path)
+        body = self.read_body()
+        call = self.headers.get('X-EBAY-API-CALL-NAME', '') if service == 'trading' else url.path
+        services.calls[f"POST {call}"] += 1
+        fail = services.delay(service)
+
+        if service == 'trading':
+            return self.trading(call, body, fail)
+        if fail:
+            return self.send_json(500, {'error_summary': 'internal_server_error/'})
+        if service == 'dropbox':
+            return self.dropbox(url.path, body)
+        self.send(404)
+
+    def trading(self, call_name, body, fail):
+        import xml.etree.ElementTree as ET
+
+        services = self.services
+        if fail:
+            errors = """
+  <Errors>
+    <ShortMessage>Injected failure.</ShortMessage>
+    <LongMessage>The fake Trading API was told to fail this call.</LongMessage>
+    <ErrorCode>10007</ErrorCode>
+    <SeverityCode>Error</SeverityCode>
+  </Errors>"""
+            return self.send(200, trading_response(call_name, 'Failure', errors), 'text/xml')
+
+        root = ET.fromstring(body)
+        ns = {'e': EBAY_NS}
+        if call_name == 'AddItem':
+            with services.lock:
+                services.next_item_id += 1
+                item_id = str(services.next_item_id)
+                services.items[item_id] = {
+                    'sku': root.findtext('.//e:SKU', '', ns),
+                    'price': root.findtext('.//e:StartPrice', '', ns),
+                    'quantity': root.findtext('.//e:Quantity', '1', ns),
+                }
+            extra = f"""
+  <ItemID>{item_id}</ItemID>
+  <StartTime>2026-01-01T00:00:00.000Z</StartTime>
+  <EndTime>2026-02-01T00:00:00.000Z</EndTime>"""
+            return self.send(200, trading_response(call_name, 'Success', extra), 'text/xml')
+
+        if call_name == 'ReviseInventoryStatus':
+            statuses = []
+            with services.lock:
+                for status in root.findall('e:InventoryStatus', ns):
+                    item_id = status.findtext('e:ItemID', '', ns)
+                    item = services.items.setdefault(item_id, {'sku': '', 'price': '', 'quantity': '1'})
+                    item['price'] = status.findtext('e:StartPrice', item['price'], ns)
+                    item['quantity'] = status.findtext('e:Quantity', item['quantity'], ns)
+                    statuses.append(f"""
+  <InventoryStatus>
+    <SKU>{item['sku']}</SKU>
+    <ItemID>{item_id}</ItemID>
+    <StartPrice currencyID="USD">{item['price']}</StartPrice>
+    <Quantity>{item['quantity']}</Quantity>
+  </InventoryStatus>""")
+            return self.send(200, trading_response(call_name, 'Success', ''.join(statuses)), 'text/xml')
+
+        if call_name in ('GetMyeBaySelling', 'GetSellerList'):
+            per_page = int(root.findtext('.//e:EntriesPerPage', '200', ns))
+            page = int(root.findtext('.//e:PageNumber', '1', ns))
+            with services.lock:
+                item_ids = sorted(services.items)
+                pages = max(1, -(-len(item_ids) // per_page))
+                items = ''.join(f"""
+    <Item>
+      <ItemID>{item_id}</ItemID>
+      <SKU>{services.items[item_id]['sku']}</SKU>
+      <QuantityAvailable>{services.items[item_id]['quantity']}</QuantityAvailable>
+      <SellingStatus><CurrentPrice currencyID="USD">{services.items[item_id]['price']}</CurrentPrice></SellingStatus>
+    </Item>""" for item_id in item_ids[(page - 1) * per_page:page * per_page])
+            pagination = f"""
+  <PaginationResult>
+    <TotalNumberOfPages>{pages}</TotalNumberOfPages>
+    <TotalNumberOfEntries>{len(item_ids)}</TotalNumberOfEntries>
+  </PaginationResult>"""
+            if call_name == 'GetMyeBaySelling':
+                extra = f"\n  <ActiveList>\n    <ItemArray>{items}\n    </ItemArray>{pagination}\n  </ActiveList>"
+            else:
+                extra = f"{pagination}\n  <ItemArray>{items}\n  </ItemArray>"
+            return self.send(200, trading_response(call_name, 'Success', extra), 'text/xml')
+
+        return self.send(200, trading_response(call_name, 'Failure', """
+  <Errors><ShortMessage>Unsupported call.</ShortMessage><SeverityCode>Error</SeverityCode></Errors>"""), 'text/xml')
+
+    def dropbox(self, path, body):
+        services = self.services
+        if path == '/2/files/upload':
+            arg = json.loads(self.headers.get('Dropbox-API-Arg', '{}'))
+            services.files[arg['path']] = body
+            return self.send_json(200, {'path_display': arg['path'], 'size': len(body)})
+
+        arg = json.loads(body or b'{}')
+        dropbox_path = arg.get('path', '')
+        if dropbox_path not in services.files:
+            return self.send_json(409, {'error_summary': 'path/not_found/'})
+        if path == '/2/files/get_temporary_link':
+            return self.send_json(200, {'link': f"{services.url}/dropbox-files{dropbox_path}"})
+        if path == '/2/sharing/create_shared_link':
+            return self.send_json(200, {'url': f"{services.url}/dropbox-files{dropbox_path}?dl=0"})
+        if path == '/2/files/delete_v2':
+            del services.files[dropbox_path]
+            return self.send_json(200, {'metadata': {'path_display': dropbox_path}})
+        self.send(404)
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+class LocalDropbox:
+    """The subset of dropbox.Dropbox that lister.upload_to_dropbox uses, against FakeServices"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def _rpc(self, route, arg):
+        response = self.session.post(f"{self.base_url}/2/{route}", json=arg, timeout=30)
+        if response.status_code != 200:
+            raise Exception(f"Dropbox {route} failed: {response.status_code} {response.text}")
+        return response.json()
+
+    def files_upload(self, data, path):
+        response = self.session.post(
+            f"{self.base_url}/2/files/upload",
+            data=data,
+            headers={'Dropbox-API-Arg': json.dumps({'path': path}), 'Content-Type': 'application/octet-stream'},
+            timeout=30
+        )
+        if response.status_code != 200:
+            raise Exception(f"Dropbox files/upload failed: {response.status_code} {response.text}")
+        return _Result(**response.json())
+
+    def files_get_temporary_link(self, path):
+        return _Result(**self._rpc('files/get_temporary_link', {'path': path}))
+
+    def sharing_create_shared_link(self, path):
+        return _Result(**self._rpc('sharing/create_shared_link', {'path': path}))
+
+    def files_delete_v2(self, path):
+        return _Result(**self._rpc('files/delete_v2', {'path': path}))
+
+FAKE_CONFIG = {
+    'appid': 'bench-app',
+    'devid': 'bench-dev',
+    'certid': 'bench-cert',
+    'token': 'bench-token',
+    'payment_policy_id': '1',
+    'return_policy_id': '2',
+    'fulfillment_policy_id': '3',
+}
@@ -0,0 +1,122 @@
+"""Chrome resource governor
+
+A Chrome session that scrapes page after page keeps growing, so long
+batches end up swapping. BrowserGovernor owns the driver, counts pages,
+samples the resident memory of chromedriver and all of its Chrome
+processes after every page, and restarts the browser after max_pages
+pages, once it goes over max_rss_mb, or when Chrome crashes. The next
+scrape starts a fresh browser transparently.
+
+    governor = BrowserGovernor()
+    product = governor.scrape(url)
+    ...
+    governor.close()
+
+Environment variables:
+    AMZLISTER_BROWSER_MAX_PAGES   pages per browser (default 50, 0 = unlimited)
+    AMZLISTER_BROWSER_MAX_RSS_MB  memory ceiling in MB (default 1024, 0 = unlimited)
+"""
+import os
+import time
+import lister
+import metrics
+from metrics import logger
+
+MAX_PAGES = int(os.environ.get('AMZLISTER_BROWSER_MAX_PAGES', 50))
+MAX_RSS_MB = int(os.environ.get('AMZLISTER_BROWSER_MAX_RSS_MB', 1024))
+
+def browser_rss(driver):
+    """Resident memory in bytes of chromedriver and every Chrome process under it, or None"""
+    import psutil
+
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass  # Renderers come and go between listing and sampling
+    return total
+
+class BrowserGovernor:
+    """Owns a Chrome driver and recycles it by page count and memory"""
+
+    def __init__(self, driver_path=lister.CHROMEDRIVER_PATH, max_pages=MAX_PAGES, max_rss_mb=MAX_RSS_MB,
+                 block_resources=True):
+        self.driver_path = driver_path
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.block_resources = block_resources
+        self._driver = None
+        self.pages = 0  # Pages served by the current browser
+        self.restarts = 0
+        self.last_rss = None
+
+    @property
+    def driver(self):
+        """The current driver, started on first use and after every recycle"""
+        if self._driver is None:
+            with metrics.span('browser.start'):
+                self._driver = lister.create_driver(self.driver_path, self.block_resources)
+            self.pages = 0
+        return self._driver
+
+    def scrape(self, url):
+        """lister.scrape_product on the governed browser, recycling it afterwards if needed
+
+        If Chrome crashes or becomes unreachable the dead driver is dropped,
+        so the next scrape starts a fresh browser.
+        """
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+
+        driver = self.driver
+        start = time.perf_counter()
+        try:
+            return lister.scrape_product(driver, url)
+        except TimeoutException:
+            raise  # No product on the page in time (captcha, dog page); the browser itself is fine
+        except WebDriverException as e:
+            logger.warning(f"Chrome failed on {url}, restarting it: {e.msg or type(e).__name__}")
+            metrics.count('browser_recycles', reason='crash')
+            self.restarts += 1
+            self.close()
+            raise
+        finally:
+            self.pages += 1
+            metrics.count('browser_pages')
+            self.check(time.perf_counter() - start)
+
+    def check(self, page_seconds=None):
+        """Sample browser memory and recycle if over the page or memory limit"""
+        if self._driver is None:
+            return
+        rss = browser_rss(self._driver)
+        if rss is not None:
+            self.last_rss = rss
+            metrics.gauge('browser_rss_bytes', rss)
+        if page_seconds is not None:
+            rss_text = f"{rss / 1048576:.0f} MB" if rss is not None else "unknown"
+            logger.debug(f"Page {self.pages} took {page_seconds:.2f}s, Chrome RSS {rss_text}")
+
+        if self.max_pages and self.pages >= self.max_pages:
+            reason = 'pages'
+        elif self.max_rss_mb and rss is not None and rss > self.max_rss_mb * 1048576:
+            reason = 'rss'
+        else:
+            return
+        logger.info(f"Recycling Chrome after {self.pages} pages at {(rss or 0) / 1048576:.0f} MB")
+        metrics.count('browser_recycles', reason=reason)
+        self.restarts += 1
+        self.close()
+
+    def close(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                logger.warning(f"Error closing Chrome: {str(e)}")
+            self._driver = None
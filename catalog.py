@@ -0,0 +1,224 @@
+"""Compact product records and columnar catalog files
+
+ProductRecord holds one scraped product in __slots__ instead of a dict,
+with interned detail keys ("Manufacturer", "ASIN", ...) and breadcrumb
+paths shared between products from the same Amazon category, so tens of
+thousands of products fit in a small footprint. It still supports
+product["title"] / product.get("details") so it can be passed anywhere a
+scraped product dict is expected.
+
+Catalogs are written column by column: Parquet or Arrow (.parquet,
+.arrow, .feather) when pyarrow is installed, otherwise CSV with the
+nested columns (details, images, breadcrumbs) as JSON.
+
+Usage:
+    python catalog.py info products.parquet
+    python catalog.py convert products.csv products.parquet
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import lister
+from metrics import logger
+
+COLUMNS = ['asin', 'url', 'title', 'price', 'description', 'availability', 'details', 'images', 'breadcrumbs',
+           'scraped_at']
+NESTED_COLUMNS = {'details', 'images', 'breadcrumbs'}  # JSON-encoded in CSV files
+ARROW_SUFFIXES = ('.parquet', '.arrow', '.feather')
+
+_breadcrumbs = {}  # ((name, node), ...) -> shared breadcrumb list
+
+def shared_breadcrumbs(breadcrumbs):
+    """One breadcrumb list per distinct path, shared by every product under it"""
+    if not breadcrumbs:
+        return []
+    key = tuple((crumb["name"], crumb.get("node")) for crumb in breadcrumbs)
+    shared = _breadcrumbs.get(key)
+    if shared is None:
+        shared = [{"name": sys.intern(name), "node": node} for name, node in key]
+        _breadcrumbs[key] = shared
+    return shared
+
+class ProductRecord:
+    """A scraped product, stored compactly"""
+    __slots__ = COLUMNS
+
+    def __init__(self, asin="", url="", title="", price="", description="", availability="", details=None,
+                 images=None, breadcrumbs=None, scraped_at=None):
+        self.asin = asin
+        self.url = url
+        self.title = title
+        self.price = price
+        self.description = description
+        self.availability = availability
+        self.details = {sys.intern(key): value for key, value in (details or {}).items()}
+        self.images = list(images or [])
+        self.breadcrumbs = shared_breadcrumbs(breadcrumbs)
+        self.scraped_at = scraped_at if scraped_at is not None else time.time()
+
+    @classmethod
+    def from_product(cls, product, url=""):
+        """Record for a dict returned by lister.scrape_product"""
+        details = product.get("details") or {}
+        return cls(
+            asin=details.get("ASIN") or lister.asin_from_url(url or "") or "",
+            url=url,
+            title=product.get("title", ""),
+            price=product.get("price", ""),
+            description=product.get("description", ""),
+            availability=product.get("availability", ""),
+            details=details,
+            images=product.get("images"),
+            breadcrumbs=product.get("breadcrumbs"),
+        )
+
+    # Dict-style access, so records work wherever scraped product dicts do
+
+    def __getitem__(self, key):
+        if key not in COLUMNS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in COLUMNS
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in COLUMNS else default
+
+    def to_dict(self):
+        return {column: getattr(self, column) for column in COLUMNS}
+
+    def __repr__(self):
+        return f"ProductRecord({self.asin!r}, {self.title[:40]!r})"
+
+def records_to_columns(records):
+    """Column lists for a sequence of records"""
+    return {column: [getattr(record, column) for record in records] for column in COLUMNS}
+
+def columns_to_records(columns):
+    """ProductRecords from column lists (missing columns get defaults)"""
+    present = [column for column in COLUMNS if column in columns]
+    rows = zip(*(columns[column] for column in present))
+    return [ProductRecord(**dict(zip(present, row))) for row in rows]
+
+def is_arrow_path(path):
+    return path.lower().endswith(ARROW_SUFFIXES)
+
+def arrow_table(columns):
+    """pyarrow Table for catalog columns, with native map/list types for the nested ones"""
+    import pyarrow as pa
+
+    types = {
+        'details': pa.map_(pa.string(), pa.string()),
+        'images': pa.list_(pa.string()),
+        'breadcrumbs': pa.list_(pa.struct([('name', pa.string()), ('node', pa.string())])),
+        'scraped_at': pa.float64(),
+    }
+    arrays = {}
+    for column, values in columns.items():
+        if column == 'details':
+            values = [list(details.items()) for details in values]
+        arrays[column] = pa.array(values, type=types.get(column, pa.string()))
+    return pa.table(arrays)
+
+def write_catalog(records, path):
+    """Write records to path; returns the path written (CSV if pyarrow is missing)"""
+    columns = records_to_columns(records)
+    if is_arrow_path(path):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            path = os.path.splitext(path)[0] + '.csv'
+            logger.warning(f"pyarrow is not installed; writing {path} instead")
+
+    tmp_path = path + '.tmp'
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        pq.write_table(arrow_table(columns), tmp_path, compression='zstd')
+    elif is_arrow_path(path):
+        import pyarrow.feather as feather
+        feather.write_feather(arrow_table(columns), tmp_path, compression='zstd')
+    else:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for row in zip(*(columns[column] for column in COLUMNS)):
+                writer.writerow([json.dumps(value) if column in NESTED_COLUMNS else value
+                                 for column, value in zip(COLUMNS, row)])
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote {len(records)} products to {path}")
+    return path
+
+def read_columns(path, columns=None):
+    """Selected columns of a catalog file as lists, without building records"""
+    columns = columns or COLUMNS
+    if is_arrow_path(path):
+        if path.lower().endswith('.parquet'):
+            import pyarrow.parquet as pq
+            table = pq.read_table(path, columns=columns)
+        else:
+            import pyarrow.feather as feather
+            table = feather.read_table(path, columns=columns)
+        data = table.to_pydict()
+        if 'details' in data:
+            data['details'] = [dict(items) if items else {} for items in data['details']]
+        return data
+
+    csv.field_size_limit(sys.maxsize)  # Descriptions can be long
+    data = {column: [] for column in columns}
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        wanted = [(column, header.index(column)) for column in columns if column in header]
+        for row in reader:
+            for column, position in wanted:
+                value = row[position]
+                if column in NESTED_COLUMNS:
+                    value = json.loads(value) if value else None
+                elif column == 'scraped_at':
+                    value = float(value) if value else None
+                data[column].append(value)
+    return {column: values for column, values in data.items() if column in dict(wanted)}
+
+def read_catalog(path):
+    """All records in a catalog file"""
+    return columns_to_records(read_columns(path))
+
+def merge_catalog(path, records):
+    """Write records into an existing catalog (if any), replacing products with the same ASIN"""
+    merged = {}
+    if os.path.exists(path):
+        for record in read_catalog(path):
+            merged[record.asin or record.url] = record
+    for record in records:
+        merged[record.asin or record.url] = record
+    return write_catalog(list(merged.values()), path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar product catalog files")
+    sub = parser.add_subparsers(dest='command', required=True)
+    info_parser = sub.add_parser('info', help="Summarize a catalog file")
+    info_parser.add_argument('path')
+    convert_parser = sub.add_parser('convert', help="Convert between CSV, Parquet and Arrow")
+    convert_parser.add_argument('source')
+    convert_parser.add_argument('destination')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        start = time.perf_counter()
+        data = read_columns(args.path, ['asin', 'price', 'breadcrumbs'])
+        elapsed = time.perf_counter() - start
+        prices = [price for price in map(lister.parse_price, data['price']) if price is not None]
+        nodes = {crumbs[-1]["name"] for crumbs in data['breadcrumbs'] if crumbs}
+        print(f"{len(data['asin'])} products in {len(nodes)} Amazon categories (read in {elapsed:.2f}s)")
+        if prices:
+            print(f"Amazon prices: {min(prices):.2f} - {max(prices):.2f}, mean {sum(prices) / len(prices):.2f}")
+    else:
+        written = write_catalog(read_catalog(args.source), args.destination)
+        print(f"Wrote {written}")
+
+if __name__ == '__main__':
+    main()
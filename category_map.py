@@ -0,0 +1,157 @@
+"""Remembered Amazon browse node -> eBay leaf category mapping
+
+Every time a product is listed, the eBay category picked for it is stored
+against the product's Amazon browse node (the last breadcrumb), together
+with the eBay category path and the category's required item specifics.
+The next product from the same node gets that category pre-selected in
+the GUI, and batch.py can list it with no Taxonomy calls and no clicks.
+
+The table lives in the ledger database (ledger.db) and is held in memory,
+so lookups are dictionary hits.
+
+Usage:
+    python category_map.py list
+    python category_map.py forget 1234567011
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import metrics
+from metrics import logger
+
+CATEGORY_MAP_FILE = 'ledger.db'  # Shares the ledger's database
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS category_map (
+    node TEXT PRIMARY KEY,
+    breadcrumb TEXT,
+    category_id TEXT NOT NULL,
+    category_path TEXT,
+    required_specifics TEXT,
+    uses INTEGER DEFAULT 0,
+    updated_at REAL
+);
+"""
+
+def node_key(product):
+    """Mapping key for a product: its Amazon browse node, or the breadcrumb text if no node ID"""
+    breadcrumbs = product.get("breadcrumbs") or []
+    if not breadcrumbs:
+        return None
+    return breadcrumbs[-1].get("node") or breadcrumb_text(breadcrumbs)
+
+def breadcrumb_text(breadcrumbs):
+    return " > ".join(crumb["name"] for crumb in breadcrumbs)
+
+class CategoryMap:
+    """Amazon browse node -> eBay category ID, path and required item specifics"""
+
+    def __init__(self, path=CATEGORY_MAP_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        """Read the whole table into memory"""
+        with self.lock:
+            self.entries.clear()
+            rows = self.db.execute(
+                "SELECT node, breadcrumb, category_id, category_path, required_specifics, uses FROM category_map")
+            for node, breadcrumb, category_id, category_path, required_specifics, uses in rows:
+                self.entries[node] = {
+                    "node": node,
+                    "breadcrumb": breadcrumb,
+                    "category_id": category_id,
+                    "category_path": json.loads(category_path) if category_path else [],
+                    "required_specifics": json.loads(required_specifics) if required_specifics else None,
+                    "uses": uses,
+                }
+
+    def lookup(self, product):
+        """The remembered mapping for a product's browse node, or None; counts hits and misses"""
+        key = node_key(product)
+        entry = self.entries.get(key) if key else None
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.count('category_map_lookups', result='hit' if entry else 'miss')
+        return entry
+
+    def hit_rate(self):
+        """Fraction of lookups in this process that found a mapping"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def remember(self, product, category_id, category_path=None, required_specifics=None):
+        """Store (or update) the eBay category chosen for a product's browse node"""
+        key = node_key(product)
+        if key is None:
+            logger.debug("Product has no breadcrumb; category not remembered")
+            return
+        previous = self.entries.get(key)
+        if required_specifics is None and previous and previous["category_id"] == str(category_id):
+            required_specifics = previous["required_specifics"]
+        entry = {
+            "node": key,
+            "breadcrumb": breadcrumb_text(product["breadcrumbs"]),
+            "category_id": str(category_id),
+            "category_path": category_path or (previous["category_path"] if previous else []),
+            "required_specifics": required_specifics,
+            "uses": (previous["uses"] if previous else 0) + 1,
+        }
+        with self.lock, self.db:
+            self.db.execute("""
+                INSERT OR REPLACE INTO category_map
+                    (node, breadcrumb, category_id, category_path, required_specifics, uses, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                key,
+                entry["breadcrumb"],
+                entry["category_id"],
+                json.dumps(entry["category_path"]),
+                json.dumps(required_specifics) if required_specifics is not None else None,
+                entry["uses"],
+                time.time(),
+            ))
+            self.entries[key] = entry
+        if previous is None or previous["category_id"] != entry["category_id"]:
+            logger.info(f"Mapped Amazon node {entry['breadcrumb']} to eBay category {category_id}")
+
+    def forget(self, node):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM category_map WHERE node = ?", (node,))
+            self.entries.pop(node, None)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Amazon browse node to eBay category mapping")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="Show every remembered mapping")
+    forget_parser = sub.add_parser('forget', help="Drop the mapping for a browse node")
+    forget_parser.add_argument('node')
+    args = parser.parse_args()
+
+    category_map = CategoryMap()
+    if args.command == 'list':
+        for entry in sorted(category_map.entries.values(), key=lambda entry: -entry["uses"]):
+            path = " > ".join(category["name"] for category in entry["category_path"]) or entry["category_id"]
+            print(f"{entry['node']}\t{entry['breadcrumb']}\t->\t{path} ({entry['category_id']})\t{entry['uses']} uses")
+    else:
+        category_map.forget(args.node)
+    category_map.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+"""Local ledger of everything we've listed, indexed by ASIN, SKU and ItemID
+
+Backed by SQLite (ledger.db) with an in-memory ASIN/SKU index, so "is this
+ASIN already listed?" is a dictionary lookup rather than an eBay call, even
+for 100k-item catalogs. The ledger can be rebuilt from eBay in bulk with
+paginated GetMyeBaySelling or GetSellerList calls.
+
+Usage:
+    python ledger.py rebuild [--source selling|seller-list] [--workers 4]
+    python ledger.py lookup B0XXXXXXXX
+    python ledger.py stats
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+import lister
+import metrics
+from metrics import logger
+
+LEDGER_FILE = 'ledger.db'
+
+ACTIVE = 'active'
+ENDED = 'ended'
+
+PAGE_SIZE = 200  # Largest EntriesPerPage eBay allows for both calls
+SELLER_LIST_WINDOW_DAYS = 119  # GetSellerList time ranges must be under 120 days
+
+COLUMNS = ['asin', 'sku', 'item_id', 'price', 'amazon_price', 'quantity', 'target_quantity',
+           'images', 'status', 'listed_at', 'updated_at', 'account']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    asin TEXT PRIMARY KEY,
+    sku TEXT,
+    item_id TEXT,
+    price REAL,
+    amazon_price REAL,
+    quantity INTEGER DEFAULT 1,
+    target_quantity INTEGER,
+    images TEXT,
+    status TEXT NOT NULL DEFAULT 'active',
+    listed_at REAL,
+    updated_at REAL,
+    account TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS listings_item_id ON listings(item_id);
+CREATE INDEX IF NOT EXISTS listings_sku ON listings(sku);
+CREATE INDEX IF NOT EXISTS listings_status ON listings(status);
+"""
+
+def row_to_entry(row):
+    entry = dict(zip(COLUMNS, row))
+    entry["images"] = json.loads(entry["images"]) if entry["images"] else []
+    if entry["target_quantity"] is None:
+        entry["target_quantity"] = entry["quantity"]
+    return entry
+
+class Ledger:
+    """ASIN -> SKU -> ItemID -> price -> eBay picture URLs -> status"""
+
+    def __init__(self, path=LEDGER_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.by_asin = {}  # ASIN -> (ItemID, status)
+        self.by_sku = {}  # SKU -> ASIN
+        self.load_index()
+
+    def load_index(self):
+        """Build the in-memory lookup tables from the database"""
+        with self.lock:
+            self.by_asin.clear()
+            self.by_sku.clear()
+            for asin, sku, item_id, status in self.db.execute("SELECT asin, sku, item_id, status FROM listings"):
+                self.by_asin[asin] = (item_id, status)
+                if sku:
+                    self.by_sku[sku] = asin
+
+    # Lookups - all O(1) against the in-memory index
+
+    def is_listed(self, asin):
+        """True if the ASIN has an active listing"""
+        found = self.by_asin.get(asin)
+        return found is not None and found[1] == ACTIVE
+
+    def item_id_for(self, asin):
+        found = self.by_asin.get(asin)
+        return found[0] if found else None
+
+    def asin_for_sku(self, sku):
+        return self.by_sku.get(sku)
+
+    def get(self, asin):
+        """Full ledger entry for an ASIN, or None"""
+        with self.lock:
+            row = self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM listings WHERE asin = ?", (asin,)).fetchone()
+        return row_to_entry(row) if row else None
+
+    def find_by_item_id(self, item_id):
+        with self.lock:
+            row = self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM listings WHERE item_id = ?", (item_id,)).fetchone()
+        return row_to_entry(row) if row else None
+
+    def listings(self, status=ACTIVE):
+        """All entries with the given status (None for every entry)"""
+        query = f"SELECT {', '.join(COLUMNS)} FROM listings"
+        with self.lock:
+            if status is None:
+                rows = self.db.execute(query).fetchall()
+            else:
+                rows = self.db.execute(query + " WHERE status = ?", (status,)).fetchall()
+        return [row_to_entry(row) for row in rows]
+
+    def active_asins(self, account=None):
+        """ASINs with active listings, optionally only those on one seller account"""
+        if account is None:
+            return [asin for asin, (_, status) in list(self.by_asin.items()) if status == ACTIVE]
+        with self.lock:
+            rows = self.db.execute("SELECT asin FROM listings WHERE status = ? AND account = ?", (ACTIVE, account))
+            return [row[0] for row in rows]
+
+    def counts(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT status, COUNT(*) FROM listings GROUP BY status").fetchall())
+
+    # Writes
+
+    def upsert_many(self, entries):
+        """Insert or update entries (dicts keyed like COLUMNS) in one transaction"""
+        now = time.time()
+        rows = []
+        for entry in entries:
+            images = entry.get("images")
+            rows.append((
+                entry["asin"],
+                entry.get("sku") or entry["asin"],
+                entry.get("item_id"),
+                entry.get("price"),
+                entry.get("amazon_price"),
+                entry.get("quantity"),
+                entry.get("target_quantity"),
+                json.dumps(images) if images is not None else None,
+                entry.get("status", ACTIVE),
+                entry.get("listed_at", now),
+                now,
+                entry.get("account"),
+                entry.get("quantity"),  # Again for the update clause, which keeps the known quantity
+            ))
+        # Keep values we already know (Amazon price, images, listed_at) when eBay doesn't send them
+        with self.lock, self.db:
+            self.db.executemany("""
+                INSERT INTO listings (asin, sku, item_id, price, amazon_price, quantity, target_quantity,
+                                      images, status, listed_at, updated_at, account)
+                VALUES (?, ?, ?, ?, ?, COALESCE(?, 1), ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(asin) DO UPDATE SET
+                    sku = excluded.sku,
+                    item_id = COALESCE(excluded.item_id, item_id),
+                    price = COALESCE(excluded.price, price),
+                    amazon_price = COALESCE(excluded.amazon_price, amazon_price),
+                    quantity = COALESCE(?, quantity),
+                    target_quantity = COALESCE(excluded.target_quantity, target_quantity),
+                    images = COALESCE(excluded.images, images),
+                    status = excluded.status,
+                    listed_at = COALESCE(listed_at, excluded.listed_at),
+                    updated_at = excluded.updated_at,
+                    account = COALESCE(excluded.account, account)
+            """, rows)
+            for row in rows:
+                self.by_asin[row[0]] = (row[2] or self.item_id_for(row[0]), row[8])
+                self.by_sku[row[1]] = row[0]
+
+    def record(self, asin, item_id, price, amazon_price=None, images=None, sku=None, quantity=1, account=None):
+        """Record a listing we just created"""
+        self.upsert_many([{
+            "account": account,
+            "asin": asin,
+            "sku": sku or asin,
+            "item_id": item_id,
+            "price": price,
+            "amazon_price": amazon_price,
+            "quantity": quantity,
+            "images": images,
+            "status": ACTIVE,
+        }])
+
+    def mark_ended(self, asins):
+        """Flag listings that are no longer live on eBay"""
+        asins = list(asins)
+        now = time.time()
+        with self.lock, self.db:
+            self.db.executemany("UPDATE listings SET status = ?, updated_at = ? WHERE asin = ?",
+                                [(ENDED, now, asin) for asin in asins])
+            for asin in asins:
+                self.by_asin[asin] = (self.item_id_for(asin), ENDED)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+# Bulk rebuild from eBay
+
+def selling_page_xml(config, page):
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<GetMyeBaySellingRequest xmlns="urn:ebay:apis:eBLBaseComponents">
+  <RequesterCredentials>
+    <eBayAuthToken>{config["token"]}</eBayAuthToken>
+  </RequesterCredentials>
+  <ActiveList>
+    <Include>true</Include>
+    <Pagination>
+      <EntriesPerPage>{PAGE_SIZE}</EntriesPerPage>
+      <PageNumber>{page}</PageNumber>
+    </Pagination>
+  </ActiveList>
+  <DetailLevel>ReturnAll</DetailLevel>
+</GetMyeBaySellingRequest>"""
+
+def seller_list_page_xml(config, page, end_from, end_to):
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<GetSellerListRequest xmlns="urn:ebay:apis:eBLBaseComponents">
+  <RequesterCredentials>
+    <eBayAuthToken>{config["token"]}</eBayAuthToken>
+  </RequesterCredentials>
+  <EndTimeFrom>{escape(end_from)}</EndTimeFrom>
+  <EndTimeTo>{escape(end_to)}</EndTimeTo>
+  <GranularityLevel>Fine</GranularityLevel>
+  <IncludeWatchCount>false</IncludeWatchCount>
+  <Pagination>
+    <EntriesPerPage>{PAGE_SIZE}</EntriesPerPage>
+    <PageNumber>{page}</PageNumber>
+  </Pagination>
+</GetSellerListRequest>"""
+
+def parse_items(root):
+    """Ledger entries for the <Item> elements of a GetMyeBaySelling/GetSellerList page"""
+    entries = []
+    for item in root.iter("Item"):
+        item_id = item.findtext("ItemID")
+        sku = item.findtext("SKU")
+        if not item_id or not sku:
+            continue  # Not one of ours - we always set the ASIN as SKU
+        price = (item.findtext("SellingStatus/CurrentPrice") or item.findtext("BuyItNowPrice")
+                 or item.findtext("StartPrice"))
+        quantity = item.findtext("QuantityAvailable") or item.findtext("Quantity")
+        listing_status = item.findtext("SellingStatus/ListingStatus") or "Active"
+        # eBay's own copies of the pictures (the links we upload from are temporary)
+        pictures = [url.text for url in item.findall("PictureDetails/PictureURL") if url.text]
+        entries.append({
+            "asin": sku,
+            "sku": sku,
+            "item_id": item_id,
+            "price": float(price) if price else None,
+            "quantity": int(quantity) if quantity else None,
+            "images": pictures or None,
+            "status": ACTIVE if listing_status == "Active" else ENDED,
+        })
+    return entries
+
+def total_pages(root):
+    pages = root.findtext(".//PaginationResult/TotalNumberOfPages")
+    return int(pages) if pages else 1
+
+def fetch_all_pages(config, call_name, page_xml, workers, session, budget=None):
+    """Fetch page 1, then every remaining page concurrently; return all entries
+
+    Each page is charged to budget (an accounts.Account), if given.
+    """
+    def fetch(page):
+        if budget is not None and not budget.spend():
+            raise Exception(f"Account {budget.name} has used its {budget.daily_call_limit} calls for today")
+        root = lister.trading_call(config, call_name, page_xml(page), session)
+        if not lister.trading_succeeded(root):
+            raise Exception(f"{call_name} page {page} failed: {'; '.join(lister.trading_errors(root))}")
+        return root
+
+    first = fetch(1)
+    entries = parse_items(first)
+    pages = total_pages(first)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for root in pool.map(fetch, range(2, pages + 1)):
+            entries.extend(parse_items(root))
+    logger.info(f"{call_name}: {len(entries)} items across {pages} pages")
+    return entries
+
+def rebuild(ledger, config, source='selling', workers=4, session=None, budget=None):
+    """Reconcile the ledger with one seller account on eBay; returns (seen, newly ended)
+
+    config is one account's settings from accounts.py. Pass the account as
+    budget to charge the calls to its daily allowance.
+    """
+    import requests
+
+    account = config.get("name")
+    if account is None and len(config.get('accounts') or []) > 1:
+        # Without a name every account's listings would look like this one's and be marked ended
+        raise Exception("Rebuild one account at a time: pass an account's settings from accounts.load_accounts()")
+
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+    with metrics.span('ledger.rebuild', source=source):
+        if source == 'selling':
+            entries = fetch_all_pages(config, 'GetMyeBaySelling',
+                                      lambda page: selling_page_xml(config, page), workers, session, budget)
+        else:
+            # GTC listings end up to 30 days out; one window from now covers every active listing
+            now = time.time()
+            end_from = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(now))
+            end_to = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(now + SELLER_LIST_WINDOW_DAYS * 86400))
+            entries = fetch_all_pages(config, 'GetSellerList',
+                                      lambda page: seller_list_page_xml(config, page, end_from, end_to),
+                                      workers, session, budget)
+
+        for entry in entries:
+            entry["account"] = account
+        ledger.upsert_many(entries)
+        seen = {entry["asin"] for entry in entries if entry["status"] == ACTIVE}
+        ended = [asin for asin in ledger.active_asins(account) if asin not in seen]
+        ledger.mark_ended(ended)
+    return len(seen), len(ended)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local listing ledger")
+    sub = parser.add_subparsers(dest='command', required=True)
+    rebuild_parser = sub.add_parser('rebuild', help="Reconcile the ledger with eBay")
+    rebuild_parser.add_argument('--source', choices=['selling', 'seller-list'], default='selling')
+    rebuild_parser.add_argument('--workers', type=int, default=4)
+    lookup_parser = sub.add_parser('lookup', help="Show the ledger entry for an ASIN, SKU or ItemID")
+    lookup_parser.add_argument('key')
+    sub.add_parser('stats', help="Count listings by status")
+    args = parser.parse_args()
+
+    metrics.setup_logging()
+    ledger = Ledger()
+    if args.command == 'rebuild':
+        import accounts
+
+        accounts_list = accounts.load_accounts(lister.load_config())
+        try:
+            for account in accounts_list:
+                account.ensure_token()
+                seen, ended = rebuild(ledger, account.config, args.source, args.workers, account.session,
+                                      budget=account)
+                print(f"{account.name}: {seen} active listings on eBay, {ended} marked ended")
+        finally:
+            accounts.save_usage(accounts_list)
+    elif args.command == 'lookup':
+        asin = ledger.asin_for_sku(args.key) or args.key
+        entry = ledger.get(asin) or ledger.find_by_item_id(args.key)
+        print(json.dumps(entry, indent=2) if entry else "Not in ledger")
+    else:
+        print(json.dumps(ledger.counts(), indent=2))
+    ledger.close()
+
+if __name__ == '__main__':
+    main()
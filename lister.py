@@ -0,0 +1,655 @@
+"""Scrape, image hosting and eBay listing logic, without any GUI
+
+main.py drives these functions from the window; the benchmarks and
+command-line tools drive them directly. Nothing here imports PyQt.
+"""
+import os
+import re
+import uuid
+import logging
+import requests
+import yaml
+from xml.sax.saxutils import escape
+import archive
+import aspects
+import metrics
+from metrics import logger
+
+# Point these at local stand-ins to run offline (see benchmarks/)
+EBAY_API_ROOT = os.environ.get('AMZLISTER_EBAY_API_ROOT', 'https://api.ebay.com')
+MARKETPLACE_ID = 'EBAY_US'
+
+CHROMEDRIVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chromedriver")
+
+# Requests scrape_product never needs - it reads the DOM and image URLs, not pixels, fonts or ads
+BLOCKED_URL_PATTERNS = [
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.m3u8",
+    "*amazon-adsystem.com*", "*doubleclick.net*", "*fls-na.amazon.com*", "*unagi.amazon.com*",
+]
+
+PRICE_MARKDOWN = 0.85  # List at 15% under the Amazon price
+DEFAULT_PRICE = "99.99"  # Used when the Amazon price can't be parsed
+
+TAXONOMY_TIMEOUT = 15  # Seconds to wait for a Taxonomy response before giving up
+
+_tree_ids = {}  # API root -> default category tree ID
+_ledger = None  # Listing ledger, opened on first use
+_category_map = None  # Browse node -> eBay category mapping, opened on first use
+
+def load_config(path='ebay.yaml'):
+    """Load eBay credentials and business policy IDs"""
+    with open(path, 'r') as f:
+        return yaml.safe_load(f)
+
+def create_driver(driver_path=CHROMEDRIVER_PATH, block_resources=True):
+    """Start headless Chrome; pass driver_path=None to let Selenium find a driver
+
+    Pages load eagerly (get() returns once the DOM is ready), and with
+    block_resources images, fonts, media and ad/tracking requests are not
+    downloaded at all.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Run in headless mode
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.page_load_strategy = 'eager'  # Don't wait for images and subframes
+    if block_resources:
+        # <img> src attributes are still in the DOM, so image URLs can be scraped
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+
+    if driver_path is None:
+        driver = webdriver.Chrome(options=chrome_options)
+    else:
+        if not os.path.exists(driver_path):
+            raise Exception("ChromeDriver not found. Please place chromedriver in the same directory as main.py")
+
+        # Set executable permissions
+        os.chmod(driver_path, 0o755)
+
+        service = Service(driver_path)
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    if block_resources:
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            logger.debug("Could not block resources over CDP: %s", e)
+    return driver
+
+def full_size_image(image_url):
+    """Convert an Amazon thumbnail URL to the 1500px version"""
+    return image_url.split('._')[0] + "._AC_SL1500_.jpg"
+
+def parse_breadcrumbs(links):
+    """Breadcrumb entries ({"name", "node"}) from (link text, href) pairs
+
+    The node is Amazon's browse node ID from the link's node= parameter, or
+    None if the link doesn't carry one.
+    """
+    breadcrumbs = []
+    for text, href in links:
+        name = (text or "").strip()
+        if not name:
+            continue
+        match = re.search(r'[?&]node=(\d+)', href or "")
+        breadcrumbs.append({"name": name, "node": match.group(1) if match else None})
+    return breadcrumbs
+
+def scrape_product(driver, url):
+    """Load an Amazon product page and extract title, price, description, details, images and breadcrumbs
+
+    Extraction is parse_product_html on the loaded page, the same code that
+    re-extracts archived pages, so improvements there apply to both.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    with metrics.span('scrape_product'):
+        with metrics.span('selenium.get'):
+            driver.get(url)
+        # Wait until the product is on the page (the DOM may still be loading with the eager strategy)
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "productTitle")))
+        html = driver.page_source
+
+        product = parse_product_html(html)
+        if product is None:
+            raise Exception(f"No product title found on {url}")
+        logger.debug("Found %d image URLs", len(product["images"]))
+
+        # Keep the raw page so it can be re-extracted later without loading it again
+        if archive.ARCHIVE_DIR:
+            archive.archive_page(product["details"].get("ASIN") or asin_from_url(url), html, url, 'selenium')
+
+        return product
+
+def parse_product_html(html):
+    """Extract a product's fields from raw page HTML (live, fetched over HTTP or archived)
+
+    Returns None if the page has no product title (captcha, error page, ...).
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    def text_of(element):
+        return aspects.strip_marks(element.get_text(" ", strip=True))
+
+    title_element = soup.find(id="productTitle")
+    if title_element is None:
+        return None
+    title = text_of(title_element)
+
+    # Get price (handling different price formats)
+    whole = soup.select_one(".a-price-whole")
+    fraction = soup.select_one(".a-price-fraction")
+    offscreen = soup.select_one(".a-offscreen")
+    if whole is not None and fraction is not None:
+        # The whole part nests <span class="a-price-decimal">.</span>, so join its text nodes without spaces
+        price = f"{whole.get_text('', strip=True).rstrip('.')}.{fraction.get_text('', strip=True)}"
+    elif offscreen is not None:
+        price = text_of(offscreen).replace("$", "").replace(",", "")
+    else:
+        price = "Price not found"
+
+    # Get description
+    description_element = soup.find(id="productDescription") or soup.find(id="feature-bullets")
+    description = text_of(description_element) if description_element is not None else "Description not found"
+
+    # Get product details
+    details = {}
+    for bullet in soup.select("#detailBullets_feature_div li"):
+        text = text_of(bullet)
+        if ":" in text:
+            key, value = text.split(":", 1)
+            details[key.strip()] = value.strip()
+
+    # Get image URLs
+    images = []
+    main_image = soup.find(id="landingImage")
+    if main_image is not None and main_image.get("src"):
+        images.append(full_size_image(main_image["src"]))
+    for img in soup.select("#altImages img.a-dynamic-image"):
+        image_url = img.get("src")
+        if image_url and "sprite" not in image_url:
+            image_url = full_size_image(image_url)
+            if image_url not in images:
+                images.append(image_url)
+
+    availability_element = soup.find(id="availability")
+    availability = text_of(availability_element) if availability_element is not None else ""
+
+    breadcrumbs = parse_breadcrumbs((text_of(link), link.get("href"))
+                                    for link in soup.select("#wayfinding-breadcrumbs_feature_div a"))
+
+    return {
+        "title": title,
+        "price": price,
+        "description": description,
+        "details": details,
+        "images": images,
+        "availability": availability,
+        "breadcrumbs": breadcrumbs
+    }
+
+def upload_to_dropbox(dbx, image_url):
+    """Copy an Amazon image into Dropbox and return (direct link, Dropbox path)"""
+    import dropbox
+
+    if dbx is None:
+        raise Exception("Dropbox token not found. Please add your token to dropbox_token.txt")
+
+    try:
+        # Download the image
+        logger.debug("Attempting to download image from: %s", image_url)
+        with metrics.span('image.download') as sp:
+            response = requests.get(image_url, timeout=30)
+            response.raise_for_status()  # Raise an exception for bad status codes
+            sp.add_bytes(received=len(response.content))
+
+        # Generate a unique filename
+        image_filename = str(uuid.uuid4()) + '.jpg'
+
+        # Ensure amazon_images folder exists
+        if not os.path.exists('amazon_images'):
+            os.makedirs('amazon_images')
+            logger.debug("Created amazon_images folder")
+
+        # Save image locally first
+        local_path = os.path.join('amazon_images', image_filename)
+        with open(local_path, 'wb') as f:
+            f.write(response.content)
+        logger.debug("Saved image locally to: %s", local_path)
+
+        # Upload to Dropbox
+        dropbox_path = f"/amazon_images/{image_filename}"
+        logger.debug("Uploading to Dropbox as: %s", dropbox_path)
+
+        with open(local_path, 'rb') as f:
+            data = f.read()
+        with metrics.span('dropbox.files_upload') as sp:
+            dbx.files_upload(data, dropbox_path)
+            sp.add_bytes(sent=len(data))
+        logger.info(f"Uploaded image to Dropbox: {dropbox_path}")
+
+        # Get temporary direct link
+        try:
+            with metrics.span('dropbox.files_get_temporary_link'):
+                result = dbx.files_get_temporary_link(dropbox_path)
+            direct_link = result.link
+            logger.debug("Generated temporary direct link: %s", direct_link)
+        except Exception as e:
+            logger.warning(f"Error getting temporary link, falling back to shared link: {str(e)}")
+            metrics.count('retries', span='dropbox.files_get_temporary_link')
+            # Fallback to shared link if temporary link fails
+            with metrics.span('dropbox.sharing_create_shared_link'):
+                shared_link = dbx.sharing_create_shared_link(dropbox_path)
+            direct_link = shared_link.url.replace('www.dropbox.com', 'dl.dropboxusercontent.com').replace('?dl=0', '?raw=1')
+            logger.debug("Fallback to shared link: %s", direct_link)
+
+        # Verify the image is accessible
+        with metrics.span('image.verify'):
+            verify_response = requests.head(direct_link, timeout=30)
+            verify_response.raise_for_status()
+        logger.debug("Verified image URL is accessible")
+
+        # Clean up local file
+        os.remove(local_path)
+
+        return direct_link, dropbox_path
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error downloading or verifying image: {str(e)}")
+        raise Exception(f"Failed to download or verify image: {str(e)}")
+    except dropbox.exceptions.DropboxException as e:
+        logger.error(f"Dropbox error: {str(e)}")
+        raise Exception(f"Failed to upload to Dropbox: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error in upload_to_dropbox: {str(e)}")
+        raise Exception(f"Failed to process image: {str(e)}")
+
+def taxonomy_headers(config):
+    """Headers for the Taxonomy REST API"""
+    return {
+        'Authorization': f'Bearer {config["token"]}',
+        'Content-Type': 'application/json'
+    }
+
+def taxonomy_get(config, span_name, path):
+    """GET a Taxonomy API path and return the decoded JSON"""
+    with metrics.span(span_name) as sp:
+        response = requests.get(
+            f'{EBAY_API_ROOT}/commerce/taxonomy/v1/{path}',
+            headers=taxonomy_headers(config),
+            timeout=TAXONOMY_TIMEOUT
+        )
+        sp.add_bytes(received=len(response.content))
+
+    if response.status_code != 200:
+        raise Exception(f"Taxonomy call {span_name} failed: {response.text}")
+    return response.json()
+
+def get_tree_id(config):
+    """Get the default category tree ID, fetching it only once"""
+    if EBAY_API_ROOT not in _tree_ids:
+        data = taxonomy_get(config, 'taxonomy.get_default_category_tree_id',
+                            f'get_default_category_tree_id?marketplace_id={MARKETPLACE_ID}')
+        _tree_ids[EBAY_API_ROOT] = data['categoryTreeId']
+    return _tree_ids[EBAY_API_ROOT]
+
+def fetch_categories(config, category_id=None):
+    """Fetch the top-level category tree, or the subtree under category_id"""
+    tree_id = get_tree_id(config)
+
+    # If no category_id provided, get top-level categories
+    if category_id is None:
+        return taxonomy_get(config, 'taxonomy.get_category_tree', f'category_tree/{tree_id}')
+
+    # Get subcategories for the selected category
+    return taxonomy_get(config, 'taxonomy.get_category_subtree',
+                        f'category_tree/{tree_id}/get_category_subtree?category_id={category_id}')
+
+def fetch_item_specifics(config, category_id):
+    """Fetch required item specifics for a category as name -> {"mode", "values"}
+
+    mode is eBay's aspectMode: for SELECTION_ONLY aspects the values are the
+    only ones allowed, for FREE_TEXT aspects they are just suggestions.
+    """
+    tree_id = get_tree_id(config)
+    data = taxonomy_get(config, 'taxonomy.get_item_aspects_for_category',
+                        f'category_tree/{tree_id}/get_item_aspects_for_category?category_id={category_id}')
+
+    required_aspects = {}
+
+    # Extract required aspects and their valid values
+    if 'aspects' in data:
+        for aspect in data['aspects']:
+            constraint = aspect.get('aspectConstraint', {})
+            if constraint.get('aspectRequired', False):
+                name = aspect['localizedAspectName']
+                values = aspect.get('aspectValues', [])
+                valid_values = [val.get('localizedValue') for val in values if 'localizedValue' in val]
+                required_aspects[name] = {"mode": constraint.get('aspectMode', 'FREE_TEXT'), "values": valid_values}
+
+    return required_aspects
+
+def trading_call(config, call_name, xml_request, session=None):
+    """POST a Trading API request and return the response root with namespaces stripped
+
+    Pass a requests.Session to reuse connections across many calls.
+    """
+    import xml.etree.ElementTree as ET
+
+    headers = {
+        'X-EBAY-API-SITEID': '0',  # US site
+        'X-EBAY-API-COMPATIBILITY-LEVEL': '1399',  # Latest version
+        'X-EBAY-API-CALL-NAME': call_name,
+        'X-EBAY-API-APP-NAME': config["appid"],
+        'X-EBAY-API-DEV-NAME': config["devid"],
+        'X-EBAY-API-CERT-NAME': config["certid"],
+        'Content-Type': 'text/xml'
+    }
+
+    if logger.isEnabledFor(logging.DEBUG):
+        # Never log the auth token
+        logger.debug("%s request: %s", call_name, xml_request.replace(config["token"], "<redacted>"))
+
+    body = xml_request.encode('utf-8')
+    with metrics.span(f'trading.{call_name}') as sp:
+        response = (session or requests).post(
+            f'{EBAY_API_ROOT}/ws/api.dll',
+            headers=headers,
+            data=body
+        )
+        sp.add_bytes(sent=len(body), received=len(response.content))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        # response.text decodes the whole body, so only do it when it will be logged
+        logger.debug("%s response: %s", call_name, response.text)
+
+    root = ET.fromstring(response.content)
+    # eBay responses are namespaced; strip it so .find(".//Ack") works
+    for element in root.iter():
+        element.tag = element.tag.split('}', 1)[-1]
+    return root
+
+def trading_succeeded(root):
+    """True if a Trading API response was accepted (Warning still means success)"""
+    ack = root.find(".//Ack")
+    return ack is not None and ack.text in ("Success", "Warning")
+
+def trading_errors(root):
+    """Collect error messages from a Trading API response"""
+    error_messages = []
+    for error in root.findall(".//Errors"):
+        if error.findtext("SeverityCode") == "Warning":
+            continue
+        short_msg = error.find("ShortMessage")
+        long_msg = error.find("LongMessage")
+        if long_msg is not None:
+            error_messages.append(long_msg.text)
+        elif short_msg is not None:
+            error_messages.append(short_msg.text)
+    return error_messages
+
+def parse_price(amazon_price):
+    """Turn a scraped price like "$1,234.56" into a float, or None"""
+    try:
+        return float(str(amazon_price).replace("$", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+def ebay_price(amazon_price):
+    """Apply the markdown rule to a scraped Amazon price; returns a "0.00" string"""
+    original_price = parse_price(amazon_price)
+    if original_price is None:
+        logger.warning("Failed to parse price, using default price")
+        return DEFAULT_PRICE  # Default price if parsing fails
+    # Apply 15% discount
+    price = "{:.2f}".format(original_price * PRICE_MARKDOWN)
+    logger.info(f"Original price: ${original_price:.2f}, Discounted price: ${price}")
+    return price
+
+def get_ledger():
+    """The listing ledger (ledger.db), opened on first use"""
+    global _ledger
+    if _ledger is None:
+        from ledger import Ledger
+        _ledger = Ledger()
+    return _ledger
+
+def set_ledger(ledger):
+    """Use a different ledger, e.g. a temporary one for benchmarks"""
+    global _ledger
+    _ledger = ledger
+
+def get_category_map():
+    """The Amazon browse node -> eBay category mapping, opened on first use"""
+    global _category_map
+    if _category_map is None:
+        from category_map import CategoryMap
+        _category_map = CategoryMap()
+    return _category_map
+
+def set_category_map(category_map):
+    """Use a different category mapping, e.g. a temporary one for benchmarks"""
+    global _category_map
+    _category_map = category_map
+
+def asin_from_url(url):
+    """Pull the ASIN out of an Amazon product URL, or None"""
+    match = re.search(r'/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})', url)
+    return match.group(1) if match else None
+
+def product_asin(product):
+    """ASIN of a scraped product from its details, or its record/URL when the details lack one"""
+    details = product.get("details") or {}
+    asin = details.get("ASIN") or product.get("asin")
+    if not asin and product.get("url"):
+        asin = asin_from_url(product.get("url"))
+    return aspects.strip_marks(asin) if asin else None
+
+def record_listing(product, item_id, price, account=None):
+    """Record a created listing (and the seller account it's on) in the ledger for repricing and syncing
+
+    Picture URLs are filled in by ledger.py rebuild from eBay's own copies.
+    """
+    sku = product_asin(product)
+    if not sku:
+        logger.warning(f"Listed item {item_id} has no ASIN; not recorded in the ledger")
+        return
+    get_ledger().record(sku, item_id, float(price), parse_price(product.get("price")), account=account)
+
+def load_listings():
+    """All active listings from the ledger, as dicts"""
+    return get_ledger().listings()
+
+def save_listings(listings):
+    """Write changed listing dicts back to the ledger"""
+    get_ledger().upsert_many(listings)
+
+def build_add_item_xml(config, product, category_id, required_specifics, hosted_image_url, price,
+                       item_specifics=None):
+    """Build the AddItem request for a scraped product"""
+    # Extract shipping dimensions and weight from product details
+    dimensions = "12 x 12 x 12"  # Default dimensions
+    weight = 1  # Default weight in pounds
+
+    if "details" in product:
+        details = product["details"]
+
+        # Extract dimensions
+        if "Product Dimensions" in details:
+            dim_str = details["Product Dimensions"]
+            # Extract numbers from string like "13.78 x 9.65 x 3.94 inches"
+            numbers = re.findall(r'\d+\.?\d*', dim_str)
+            if len(numbers) >= 3:
+                dimensions = f"{numbers[0]} x {numbers[1]} x {numbers[2]}"
+
+        # Extract weight
+        if "Product Dimensions" in details:
+            weight_str = details["Product Dimensions"]
+            # Extract weight from string like "3.44 Pounds"
+            weight_match = re.search(r'(\d+\.?\d*)\s*Pounds?', weight_str)
+            if weight_match:
+                weight = int(float(weight_match.group(1)) + 0.5)  # Round up to nearest pound
+
+    # The ASIN is the SKU
+    sku = product_asin(product) or ""
+
+    # Fill item specifics from the product's details unless the caller already did (batch.py fills a whole batch)
+    if item_specifics is None:
+        fill = aspects.fill_aspects(product, category_id, required_specifics)
+        item_specifics = fill["specifics"]
+        logger.debug("Item specifics %s (confidence %.2f)", item_specifics, fill['score'])
+
+    item_specifics_list = []
+    # Convert to XML format
+    for name, value in item_specifics.items():
+        item_specifics_list.append(f"""
+      <NameValueList>
+        <Name>{escape(name)}</Name>
+        <Value>{escape(value)}</Value>
+      </NameValueList>""")
+
+    item_specifics_xml = "\n".join(item_specifics_list)
+
+    # Escape special characters in title and description
+    title = escape(product["title"][:80])
+    description = escape(product["description"])
+
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<AddItemRequest xmlns="urn:ebay:apis:eBLBaseComponents">
+  <RequesterCredentials>
+    <eBayAuthToken>{config["token"]}</eBayAuthToken>
+  </RequesterCredentials>
+  <ErrorLanguage>en_US</ErrorLanguage>
+  <WarningLevel>High</WarningLevel>
+  <Item>
+    <Title>{title}</Title>
+    <Description><![CDATA[{description}]]></Description>
+    <PrimaryCategory>
+      <CategoryID>{category_id}</CategoryID>
+    </PrimaryCategory>
+    <StartPrice>{price}</StartPrice>
+    <CategoryMappingAllowed>true</CategoryMappingAllowed>
+    <ConditionID>1000</ConditionID>
+    <Country>US</Country>
+    <Currency>USD</Currency>
+    <ListingDuration>GTC</ListingDuration>
+    <ListingType>FixedPriceItem</ListingType>
+    <PictureDetails>
+      <GalleryType>Gallery</GalleryType>
+      <PictureURL>{hosted_image_url}</PictureURL>
+    </PictureDetails>
+    <PostalCode>95125</PostalCode>
+    <Quantity>1</Quantity>
+    <SKU>{sku}</SKU>
+    <ItemSpecifics>{item_specifics_xml}
+    </ItemSpecifics>
+    <ShippingPackageDetails>
+      <MeasurementUnit>English</MeasurementUnit>
+      <PackageDepth>{dimensions.split(' x ')[2]}</PackageDepth>
+      <PackageLength>{dimensions.split(' x ')[0]}</PackageLength>
+      <PackageWidth>{dimensions.split(' x ')[1]}</PackageWidth>
+      <ShippingPackage>PackageThickEnvelope</ShippingPackage>
+      <WeightMajor>{weight}</WeightMajor>
+      <WeightMinor>0</WeightMinor>
+    </ShippingPackageDetails>
+    <SellerProfiles>
+      <SellerPaymentProfile>
+        <PaymentProfileID>{config["payment_policy_id"]}</PaymentProfileID>
+      </SellerPaymentProfile>
+      <SellerReturnProfile>
+        <ReturnProfileID>{config["return_policy_id"]}</ReturnProfileID>
+      </SellerReturnProfile>
+      <SellerShippingProfile>
+        <ShippingProfileID>{config["fulfillment_policy_id"]}</ShippingProfileID>
+      </SellerShippingProfile>
+    </SellerProfiles>
+    <Site>US</Site>
+  </Item>
+</AddItemRequest>"""
+
+def list_product(config, dbx, product, category_id, required_specifics, require_https=True,
+                 allow_duplicate=False, session=None, item_specifics=None):
+    """Host the main image, post AddItem and return (item ID, listed price)
+
+    config is ebay.yaml or one account's settings from accounts.py; pass
+    that account's session to reuse its connections. item_specifics (name ->
+    value, from aspects.py) skips filling them here. Raises an Exception if the ASIN is already listed according to the
+    ledger, or with eBay's error messages if the listing is rejected.
+    """
+    # Verify required credentials are present
+    required_fields = ["appid", "devid", "certid", "token"]
+    missing_fields = [field for field in required_fields if field not in config]
+    if missing_fields:
+        raise Exception(f"Missing required eBay credentials in ebay.yaml: {', '.join(missing_fields)}")
+
+    # Local duplicate check - no eBay call needed
+    asin = product_asin(product)
+    if asin and not allow_duplicate and get_ledger().is_listed(asin):
+        metrics.count('duplicates_skipped')
+        raise Exception(f"ASIN {asin} is already listed as eBay item {get_ledger().item_id_for(asin)}")
+
+    with metrics.span('post_to_ebay'):
+        # Get and validate image URL
+        image_url = None
+        if "images" in product and product["images"]:
+            image_url = product["images"][0]
+            logger.debug("Found main image URL: %s", image_url)
+
+        if not image_url:
+            raise Exception("No image URL found in product data")
+
+        # Upload image to Dropbox and get direct link
+        try:
+            with metrics.span('upload_to_dropbox'):
+                hosted_image_url, dropbox_path = upload_to_dropbox(dbx, image_url)
+            logger.debug("Successfully got hosted image URL: %s", hosted_image_url)
+
+            if require_https and not hosted_image_url.startswith('https://'):
+                raise Exception("Invalid image URL format - must be HTTPS")
+
+            # XML encode the URL
+            hosted_image_url = escape(hosted_image_url)
+        except Exception as e:
+            raise Exception(f"Failed to process image: {str(e)}")
+
+        price = ebay_price(product["price"])
+        xml_request = build_add_item_xml(config, product, category_id, required_specifics, hosted_image_url, price,
+                                         item_specifics)
+
+        root = trading_call(config, 'AddItem', xml_request, session)
+
+    if not trading_succeeded(root):
+        error_messages = trading_errors(root)
+        error_text = "\n".join(error_messages) if error_messages else "Unknown error occurred"
+        metrics.count('errors', span='trading.AddItem', error='Failure')
+        logger.error(f"AddItem failed: {error_text}")
+        raise Exception(f"Failed to list item:\n{error_text}")
+
+    # Clean up Dropbox file after successful listing
+    if dropbox_path:
+        try:
+            with metrics.span('dropbox.files_delete_v2'):
+                dbx.files_delete_v2(dropbox_path)
+            logger.debug("Deleted file from Dropbox: %s", dropbox_path)
+        except Exception as e:
+            logger.warning(f"Failed to delete Dropbox file: {str(e)}")
+
+    metrics.count('listings_created')
+    item_id = root.findtext(".//ItemID")
+    logger.info(f"Listed item {item_id}")
+    if item_id:
+        record_listing(product, item_id, price, config.get("name"))
+    return item_id, price
@@ -1,223 +1,304 @@
 import sys
-import os
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLineEdit, QPushButton, QTextEdit, 
-                            QLabel, QMessageBox, QComboBox, QDialog, QFrame,
+                            QLabel, QMessageBox, QColumnView, QComboBox, QDialog, QFrame,
                             QStyle, QGroupBox, QFormLayout)
-from PyQt6.QtCore import Qt, QUrl
+from PyQt6.QtCore import Qt, QUrl, QThread, QTimer, pyqtSignal, QAbstractItemModel, QModelIndex
 from PyQt6.QtGui import QDesktopServices
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 import requests
 import json
-import yaml
-import uuid
-import dropbox
-from dropbox.files import WriteMode
-from dropbox.exceptions import ApiError, AuthError
-import xml.etree.ElementTree as ET
-from xml.sax.saxutils import escape
+import time
+import accounts
+import aspects
+import lister
+import metrics
+from browser import BrowserGovernor
+from catalog import ProductRecord
+from metrics import logger
+
+# Selenium, Dropbox and ElementTree are imported where they are first used
+# (mostly in lister.py) so the window can appear without paying for them at
+# startup.
+
+CATEGORY_CACHE_FILE = 'category_cache.json'
+CATEGORY_CACHE_MAX_AGE = 7 * 24 * 60 * 60  # Re-download top-level categories weekly
+
+CATEGORY_ID_ROLE = Qt.ItemDataRole.UserRole
+# Longest closing waits for the top-level download (tree ID plus categories, each bounded by lister.TAXONOMY_TIMEOUT)
+CATEGORY_LOADER_WAIT_MS = (2 * lister.TAXONOMY_TIMEOUT + 1) * 1000
+FETCH_BATCH_SIZE = 200  # Rows handed to the view per fetchMore, so huge levels appear at once
+
+def load_category_cache():
+    """Return cached top-level categories, or None if missing or stale"""
+    try:
+        with open(CATEGORY_CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+        if time.time() - cache.get('saved_at', 0) > CATEGORY_CACHE_MAX_AGE:
+            return None
+        return cache.get('categories')
+    except (OSError, ValueError):
+        return None
+
+def save_category_cache(categories):
+    """Write top-level categories to the local cache file"""
+    try:
+        with open(CATEGORY_CACHE_FILE, 'w') as f:
+            json.dump({'saved_at': time.time(), 'categories': categories}, f)
+    except OSError as e:
+        logger.warning(f"Error saving category cache: {str(e)}")
+
+class CategoryLoader(QThread):
+    """Download top-level categories off the GUI thread"""
+    categories_loaded = pyqtSignal(object)
+
+    def __init__(self, category_selector, parent=None):
+        super().__init__(parent)
+        self.category_selector = category_selector
+
+    def run(self):
+        categories = []
+        response = self.category_selector.fetch_categories()
+        if response and 'rootCategoryNode' in response:
+            for category in response['rootCategoryNode'].get('childCategoryTreeNodes', []):
+                categories.append({
+                    'id': category['category']['categoryId'],
+                    'name': category['category']['categoryName']
+                })
+        self.categories_loaded.emit(categories)
+
+class CategoryNode:
+    """One category in the lazily filled tree"""
+    __slots__ = ('category_id', 'name', 'parent', 'row', 'children', 'pending', 'is_leaf')
+
+    def __init__(self, category_id, name, parent=None, row=0, pending=None, is_leaf=False):
+        self.category_id = category_id
+        self.name = name
+        self.parent = parent
+        self.row = row
+        self.children = []
+        self.pending = pending  # Taxonomy child nodes not yet in the model; None until fetched
+        self.is_leaf = is_leaf
+
+def category_node_from_taxonomy(tree_node, parent, row):
+    """CategoryNode for a Taxonomy API categoryTreeNode"""
+    category = tree_node['category']
+    # Subtree responses nest every descendant, so deeper levels need no further calls
+    return CategoryNode(category['categoryId'], category['categoryName'], parent, row,
+                        pending=tree_node.get('childCategoryTreeNodes'),
+                        is_leaf=tree_node.get('leafCategoryTreeNode', False))
+
+class CategoryTreeModel(QAbstractItemModel):
+    """eBay category tree that pulls children on demand through canFetchMore/fetchMore"""
+
+    def __init__(self, fetch_children, parent=None):
+        super().__init__(parent)
+        self.fetch_children = fetch_children  # category ID -> list of Taxonomy child nodes, or None
+        self.root = CategoryNode(None, "", pending=[])
+
+    def set_top_level(self, categories):
+        """Replace the tree with top-level categories ({'id', 'name'} dicts)"""
+        self.beginResetModel()
+        self.root = CategoryNode(None, "", pending=[])
+        self.root.children = [CategoryNode(category['id'], category['name'], self.root, row)
+                              for row, category in enumerate(categories)]
+        self.endResetModel()
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if column != 0 or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, 0, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return node.name
+        if role == CATEGORY_ID_ROLE:
+            return node.category_id
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{node.name} ({node.category_id})"
+        return None
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        if node is self.root:
+            return bool(node.children)
+        return not node.is_leaf
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return not node.is_leaf and (node.pending is None or len(node.pending) > 0)
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        if node.pending is None:
+            children = self.fetch_children(node.category_id)
+            if children is None:
+                node.pending = []  # Fetch failed - show it empty rather than retrying on every repaint
+                return
+            if not children:
+                node.is_leaf = True
+            node.pending = children
+
+        batch, node.pending = node.pending[:FETCH_BATCH_SIZE], node.pending[FETCH_BATCH_SIZE:]
+        if not batch:
+            return
+        start = len(node.children)
+        self.beginInsertRows(parent, start, start + len(batch) - 1)
+        node.children.extend(category_node_from_taxonomy(tree_node, node, start + offset)
+                             for offset, tree_node in enumerate(batch))
+        self.endInsertRows()
+
+    def fetch_all(self, parent):
+        while self.canFetchMore(parent):
+            self.fetchMore(parent)
+
+    def find_child(self, parent, category_id):
+        """Index of the child with the given category ID, fetching as needed"""
+        self.fetch_all(parent)
+        for node in self.node(parent).children:
+            if node.category_id == category_id:
+                return self.createIndex(node.row, 0, node)
+        return QModelIndex()
 
 class CategorySelector:
-    def __init__(self, parent_layout):
+    def __init__(self, parent_layout, get_config):
         self.parent_layout = parent_layout
-        self.category_layouts = {}
-        self.category_combos = {}
-        self.category_tree = {}
-        self.current_path = {}
+        self.get_config = get_config  # Settings of the seller account to make Taxonomy calls with
         self.required_specifics = {}  # Store required item specifics
-        
-        # Add first level
-        self.add_category_level(0)
-        
+        self.known_specifics = None  # (category ID, specifics) remembered for a pre-selected leaf
+
+        self.model = CategoryTreeModel(self.fetch_children)
+        self.view = QColumnView()
+        self.view.setModel(self.model)
+        self.view.setMinimumHeight(220)
+
+        self.label = QLabel("Category:")
+        parent_layout.addWidget(self.label)
+        parent_layout.addWidget(self.view)
+
         # Connect events
-        self.category_combos[0].currentIndexChanged.connect(lambda: self.on_category_selected(0))
-        
-    def add_category_level(self, level):
-        """Add a new category selection level to the UI"""
-        layout = QHBoxLayout()
-        combo = QComboBox()
-        combo.setPlaceholderText("Select category...")
-        
-        layout.addWidget(QLabel(f"Category Level {level + 1}:"))
-        layout.addWidget(combo)
-        
-        self.parent_layout.addLayout(layout)
-        self.category_layouts[level] = layout
-        self.category_combos[level] = combo
-        
-    def clear_category_levels(self, start_level=0):
-        """Clear category levels starting from the given level"""
-        for level in sorted(self.category_layouts.keys()):
-            if level >= start_level:
-                layout = self.category_layouts[level]
-                while layout.count():
-                    item = layout.takeAt(0)
-                    if item.widget():
-                        item.widget().deleteLater()
-                self.parent_layout.removeItem(layout)
-                del self.category_layouts[level]
-                del self.category_combos[level]
-                if level in self.current_path:
-                    del self.current_path[level]
-                    
+        self.view.selectionModel().currentChanged.connect(self.on_category_selected)
+
+    def set_top_level(self, categories):
+        """Show top-level categories ({'id', 'name'} dicts) in the first column"""
+        self.model.set_top_level(categories)
+        self.label.setText("Category:")
+        self.required_specifics = {}
+
+    def set_loading(self):
+        self.label.setText("Category (loading...):")
+
     def fetch_categories(self, category_id=None):
         """Fetch categories from eBay Taxonomy API"""
         try:
-            with open('ebay.yaml', 'r') as f:
-                config = yaml.safe_load(f)
-            
-            headers = {
-                'Authorization': f'Bearer {config["token"]}',
-                'Content-Type': 'application/json'
-            }
-            
-            # First, get the default category tree ID
-            response = requests.get(
-                'https://api.ebay.com/commerce/taxonomy/v1/get_default_category_tree_id?marketplace_id=EBAY_US',
-                headers=headers
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Failed to get category tree ID: {response.text}")
-                
-            tree_id = response.json()['categoryTreeId']
-            
-            # If no category_id provided, get top-level categories
-            if category_id is None:
-                response = requests.get(
-                    f'https://api.ebay.com/commerce/taxonomy/v1/category_tree/{tree_id}',
-                    headers=headers
-                )
-            else:
-                # Get subcategories for the selected category
-                response = requests.get(
-                    f'https://api.ebay.com/commerce/taxonomy/v1/category_tree/{tree_id}/get_category_subtree?category_id={category_id}',
-                    headers=headers
-                )
-            
-            if response.status_code != 200:
-                raise Exception(f"Failed to get categories: {response.text}")
-                
-            return response.json()
-            
+            return lister.fetch_categories(self.get_config(), category_id)
         except Exception as e:
-            print(f"Error fetching categories: {str(e)}")
+            logger.error(f"Error fetching categories: {str(e)}")
             return None
-            
+
+    def fetch_children(self, category_id):
+        """Taxonomy child nodes of a category, or None if the request failed"""
+        response = self.fetch_categories(category_id)
+        if not response or 'categorySubtreeNode' not in response:
+            return None
+        return response['categorySubtreeNode'].get('childCategoryTreeNodes', [])
+
     def fetch_item_specifics(self, category_id):
         """Fetch required item specifics for a category"""
         try:
-            with open('ebay.yaml', 'r') as f:
-                config = yaml.safe_load(f)
-            
-            headers = {
-                'Authorization': f'Bearer {config["token"]}',
-                'Content-Type': 'application/json'
-            }
-            
-            # Get the default category tree ID
-            response = requests.get(
-                'https://api.ebay.com/commerce/taxonomy/v1/get_default_category_tree_id?marketplace_id=EBAY_US',
-                headers=headers
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Failed to get category tree ID: {response.text}")
-                
-            tree_id = response.json()['categoryTreeId']
-            
-            # Get item specifics for the category
-            response = requests.get(
-                f'https://api.ebay.com/commerce/taxonomy/v1/category_tree/{tree_id}/get_item_aspects_for_category?category_id={category_id}',
-                headers=headers
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"Failed to get item specifics: {response.text}")
-            
-            data = response.json()
-            required_aspects = {}
-            
-            # Extract required aspects and their valid values
-            if 'aspects' in data:
-                for aspect in data['aspects']:
-                    if aspect.get('aspectConstraint', {}).get('aspectRequired', False):
-                        name = aspect['localizedAspectName']
-                        values = aspect.get('aspectValues', [])
-                        valid_values = [val.get('localizedValue') for val in values if 'localizedValue' in val]
-                        required_aspects[name] = valid_values
-            
-            return required_aspects
-            
+            return lister.fetch_item_specifics(self.get_config(), category_id)
         except Exception as e:
-            print(f"Error fetching item specifics: {str(e)}")
+            logger.error(f"Error fetching item specifics: {str(e)}")
             return {}
 
-    def on_category_selected(self, level):
-        """Handle category selection at a specific level"""
-        if level not in self.category_combos:
-            return
-            
-        combo = self.category_combos[level]
-        selected_text = combo.currentText()
-        if not selected_text:
+    def on_category_selected(self, current, previous=None):
+        """Handle a category being selected in any column"""
+        self.required_specifics = {}
+        if not current.isValid():
             return
-            
+
         try:
-            # Extract category ID from the selected text
-            category_id = selected_text.split("(")[-1].replace(")", "").strip()
-            
-            # Update current path
-            self.current_path[level] = category_id
-            
-            # Clear subsequent levels
-            self.clear_category_levels(level + 1)
-            
-            # Fetch subcategories
-            response = self.fetch_categories(category_id)
-            if response and 'categorySubtreeNode' in response:
-                subcategories = response['categorySubtreeNode'].get('childCategoryTreeNodes', [])
-                
-                if subcategories:
-                    next_level = level + 1
-                    self.add_category_level(next_level)
-                    new_combo = self.category_combos[next_level]
-                    
-                    # Add subcategories to the new dropdown
-                    for category in subcategories:
-                        cat_id = category['category']['categoryId']
-                        cat_name = category['category']['categoryName']
-                        new_combo.addItem(f"{cat_name} ({cat_id})")
-                    
-                    # Connect the new dropdown's selection event
-                    new_combo.currentIndexChanged.connect(lambda: self.on_category_selected(next_level))
-                else:
-                    # This is a leaf category - fetch required item specifics
-                    self.required_specifics = self.fetch_item_specifics(category_id)
-                    print(f"Required item specifics for category {category_id}:")
-                    for name, values in self.required_specifics.items():
-                        print(f"- {name}: {', '.join(values) if values else 'Any value'}")
-                    
+            # Find out whether it has children before deciding it's a leaf
+            if self.model.canFetchMore(current):
+                self.model.fetchMore(current)
+            node = self.model.node(current)
+            if not node.is_leaf:
+                return
+
+            category_id = current.data(CATEGORY_ID_ROLE)
+            if self.known_specifics and self.known_specifics[0] == category_id:
+                # Pre-selected leaf - reuse the item specifics remembered with the mapping
+                self.required_specifics = self.known_specifics[1]
+            else:
+                # This is a leaf category - fetch required item specifics
+                self.required_specifics = self.fetch_item_specifics(category_id)
+                logger.info(f"Required item specifics for category {category_id}:")
+                for name, aspect in self.required_specifics.items():
+                    values = ', '.join(aspect['values']) or 'Any value'
+                    logger.info(f"- {name} ({aspect['mode']}): {values}")
+
         except Exception as e:
-            print(f"Error in category selection: {str(e)}")
-            print("Selected text:", selected_text)
-            
+            logger.error(f"Error in category selection: {str(e)}")
+
     def get_selected_category_id(self):
-        """Get the ID of the last selected category (leaf node)"""
-        if not self.current_path:
-            return None
-        return list(self.current_path.values())[-1]
-        
+        """Get the ID of the selected category"""
+        index = self.view.currentIndex()
+        return index.data(CATEGORY_ID_ROLE) if index.isValid() else None
+
     def get_required_specifics(self):
         """Get the required item specifics for the selected category"""
         return self.required_specifics
 
+    def get_selected_path(self):
+        """The selected categories from the top level down, as {'id', 'name'} dicts"""
+        path = []
+        index = self.view.currentIndex()
+        while index.isValid():
+            path.insert(0, {'id': index.data(CATEGORY_ID_ROLE), 'name': index.data()})
+            index = index.parent()
+        return path
+
+    def select_path(self, path, required_specifics=None):
+        """Select a remembered category path; return False if it can't be found in the tree"""
+        if not path:
+            return False
+        self.known_specifics = (path[-1]['id'], required_specifics) if required_specifics is not None else None
+        try:
+            index = QModelIndex()
+            for category in path:
+                index = self.model.find_child(index, category['id'])
+                if not index.isValid():
+                    return False
+            if self.view.currentIndex() == index:
+                self.on_category_selected(index)
+            else:
+                self.view.setCurrentIndex(index)
+            return self.get_selected_category_id() == path[-1]['id']
+        finally:
+            self.known_specifics = None
+
 class ListingSuccessDialog(QDialog):
     def __init__(self, item_id, title, price, parent=None):
         super().__init__(parent)
@@ -296,14 +377,22 @@ class AmazonEbayScraper(QMainWindow):
         self.setWindowTitle("Amazon to eBay Scraper")
         self.setGeometry(100, 100, 800, 600)
         
-        # Initialize Dropbox client
-        self.dbx = None
+        # Read the Dropbox token now, but create the client on first upload
+        self._dbx = None
+        self.dropbox_token = None
         try:
             with open('dropbox_token.txt', 'r') as f:
-                token = f.read().strip()
-                self.dbx = dropbox.Dropbox(token)
-        except:
-            QMessageBox.warning(self, "Warning", "Dropbox token not found. Please add your token to dropbox_token.txt")
+                self.dropbox_token = f.read().strip()
+        except OSError:
+            pass
+
+        # Seller accounts from ebay.yaml; Taxonomy calls and listings use the selected one
+        try:
+            self.accounts = accounts.load_accounts(lister.load_config())
+        except Exception as e:
+            logger.error(f"Could not load eBay accounts from ebay.yaml: {str(e)}")
+            self.accounts = []
+        self.account = self.accounts[0] if self.accounts else None
         
         # Main widget and layout
         main_widget = QWidget()
@@ -321,11 +410,22 @@ class AmazonEbayScraper(QMainWindow):
         self.scrape_button.clicked.connect(self.scrape_product)
         url_layout.addWidget(self.scrape_button)
         layout.addLayout(url_layout)
+
+        # Seller account, when ebay.yaml lists more than one
+        if len(self.accounts) > 1:
+            account_layout = QHBoxLayout()
+            account_layout.addWidget(QLabel("Seller account:"))
+            self.account_combo = QComboBox()
+            self.account_combo.addItems([account.name for account in self.accounts])
+            self.account_combo.currentIndexChanged.connect(self.select_account)
+            account_layout.addWidget(self.account_combo)
+            account_layout.addStretch()
+            layout.addLayout(account_layout)
         
         # Category selection
         category_container = QWidget()
         category_layout = QVBoxLayout(category_container)
-        self.category_selector = CategorySelector(category_layout)
+        self.category_selector = CategorySelector(category_layout, self.account_config)
         layout.addWidget(category_container)
         
         # Results display
@@ -340,30 +440,43 @@ class AmazonEbayScraper(QMainWindow):
         layout.addWidget(self.ebay_button)
         
         self.product_data = None
-        self.driver = None
+        self.browser = None
+        self.category_loader = None
         
-        # Load initial categories
+        # Load initial categories from the cache, or in the background
         self.load_initial_categories()
+        
+        if not self.dropbox_token:
+            # Deferred so the warning does not hold up the first paint
+            QTimer.singleShot(0, lambda: QMessageBox.warning(self, "Warning", "Dropbox token not found. Please add your token to dropbox_token.txt"))
+
+    def select_account(self, index):
+        self.account = self.accounts[index]
+        logger.info(f"Listing on seller account {self.account.name}")
+
+    def account_config(self):
+        """Settings of the selected seller account, with a fresh token"""
+        account = self.account
+        if account is None:
+            raise Exception("No eBay account found in ebay.yaml")
+        account.ensure_token()
+        return account.config
+
+    @property
+    def dbx(self):
+        """Dropbox client, created on first use"""
+        if self._dbx is None and self.dropbox_token:
+            import dropbox
+            self._dbx = dropbox.Dropbox(self.dropbox_token)
+        return self._dbx
 
     def setup_driver(self):
         try:
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")  # Run in headless mode
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            
-            # Use local ChromeDriver
-            driver_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chromedriver")
-            if not os.path.exists(driver_path):
-                QMessageBox.critical(self, "Error", "ChromeDriver not found. Please place chromedriver in the same directory as main.py")
-                return None
-                
-            # Set executable permissions
-            os.chmod(driver_path, 0o755)
-            
-            service = Service(driver_path)
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # Recycled after a number of pages or when it grows too large
+            self.browser = BrowserGovernor()
+            self.browser.driver
         except Exception as e:
+            self.browser = None
             QMessageBox.critical(self, "Error", f"ChromeDriver setup failed: {str(e)}")
             return None
 
@@ -372,85 +485,32 @@ class AmazonEbayScraper(QMainWindow):
         if not url:
             QMessageBox.warning(self, "Error", "Please enter an Amazon URL")
             return
-            
+
+        # Check the ledger before spending a page load on something we've already listed
+        asin = lister.asin_from_url(url)
+        if asin and lister.get_ledger().is_listed(asin):
+            answer = QMessageBox.question(
+                self, "Already Listed",
+                f"ASIN {asin} is already listed as eBay item {lister.get_ledger().item_id_for(asin)}.\n"
+                "Scrape it anyway?"
+            )
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+
         try:
-            if not self.driver:
+            if not self.browser:
                 self.setup_driver()
-                
-            self.driver.get(url)
-            wait = WebDriverWait(self.driver, 10)
-            
-            # Scrape product information
-            title = wait.until(EC.presence_of_element_located((By.ID, "productTitle"))).text.strip()
-            
-            # Get price (handling different price formats)
-            try:
-                price = self.driver.find_element(By.CLASS_NAME, "a-price-whole").text.strip()
-                cents = self.driver.find_element(By.CLASS_NAME, "a-price-fraction").text.strip()
-                price = f"{price}.{cents}"
-            except:
-                try:
-                    price = self.driver.find_element(By.CLASS_NAME, "a-offscreen").text.strip()
-                    price = price.replace("$", "").replace(",", "")
-                except:
-                    price = "Price not found"
-            
-            # Get description
-            description = ""
-            try:
-                description = self.driver.find_element(By.ID, "productDescription").text.strip()
-            except:
-                try:
-                    description = self.driver.find_element(By.ID, "feature-bullets").text.strip()
-                except:
-                    description = "Description not found"
-                
-            # Get product details
-            details = {}
-            try:
-                detail_bullets = self.driver.find_elements(By.CSS_SELECTOR, "#detailBullets_feature_div li")
-                for bullet in detail_bullets:
-                    text = bullet.text.strip()
-                    if ":" in text:
-                        key, value = text.split(":", 1)
-                        details[key.strip()] = value.strip()
-            except:
-                details = {"Error": "Could not fetch product details"}
-                
-            # Get image URLs
-            images = []
-            try:
-                # Try to get the main product image first
-                main_image = self.driver.find_element(By.ID, "landingImage")
-                if main_image:
-                    image_url = main_image.get_attribute("src")
-                    if image_url:
-                        # Convert thumbnail URL to full-size image URL
-                        image_url = image_url.split('._')[0] + "._AC_SL1500_.jpg"
-                        images.append(image_url)
-                        print(f"Found main image URL: {image_url}")
-                
-                # Try to get additional images
-                alt_images = self.driver.find_elements(By.CSS_SELECTOR, "#altImages img.a-dynamic-image")
-                for img in alt_images:
-                    image_url = img.get_attribute("src")
-                    if image_url and "sprite" not in image_url:
-                        # Convert thumbnail URL to full-size image URL
-                        image_url = image_url.split('._')[0] + "._AC_SL1500_.jpg"
-                        if image_url not in images:
-                            images.append(image_url)
-                            print(f"Found additional image URL: {image_url}")
-            except Exception as e:
-                print(f"Error getting images: {str(e)}")
-                
+                if not self.browser:
+                    return
+
             # Store the data
-            self.product_data = {
-                "title": title,
-                "price": price,
-                "description": description,
-                "details": details,
-                "images": images
-            }
+            self.product_data = ProductRecord.from_product(self.browser.scrape(url), url)
+            title = self.product_data["title"]
+            price = self.product_data["price"]
+            description = self.product_data["description"]
+            details = self.product_data["details"]
+            images = self.product_data["images"]
+            breadcrumbs = self.product_data["breadcrumbs"]
             
             # Display the results
             display_text = f"""
@@ -470,13 +530,30 @@ Product Details:
                     display_text += f"{url}\n"
             else:
                 display_text += "\nNo images found!"
-                
+
+            # Pre-select the eBay category used last time for this Amazon browse node
+            if breadcrumbs:
+                display_text += f"\nAmazon Category: {' > '.join(crumb['name'] for crumb in breadcrumbs)}\n"
+                mapping = lister.get_category_map().lookup(self.product_data)
+                if mapping and self.category_selector.select_path(mapping["category_path"],
+                                                                  mapping["required_specifics"]):
+                    path = ' > '.join(category['name'] for category in mapping["category_path"])
+                    display_text += f"eBay Category (remembered): {path} ({mapping['category_id']})\n"
+                    if mapping["required_specifics"] is not None:
+                        fill = aspects.fill_aspects(self.product_data, mapping["category_id"],
+                                                    mapping["required_specifics"])
+                        display_text += f"\nItem Specifics (confidence {fill['score']:.0%}):\n"
+                        for name, value in fill["specifics"].items():
+                            display_text += f"{name}: {value} ({fill['confidence'][name]:.0%}, " \
+                                            f"from {fill['sources'][name]})\n"
+
             self.results_display.setText(display_text)
             self.ebay_button.setEnabled(True)
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
             
+
     def download_and_prepare_image(self, image_url):
         """Download image locally and prepare it for eBay upload"""
         try:
@@ -509,70 +586,6 @@ Product Details:
         except Exception as e:
             raise Exception(f"Failed to download and prepare image: {str(e)}")
 
-    def upload_to_dropbox(self, image_url):
-        try:
-            # Download the image
-            print(f"Attempting to download image from: {image_url}")
-            response = requests.get(image_url, timeout=30)
-            response.raise_for_status()  # Raise an exception for bad status codes
-            
-            # Generate a unique filename
-            image_filename = str(uuid.uuid4()) + '.jpg'
-            
-            # Ensure amazon_images folder exists
-            if not os.path.exists('amazon_images'):
-                os.makedirs('amazon_images')
-                print("Created amazon_images folder")
-            else:
-                print("Found existing amazon_images folder")
-            
-            # Save image locally first
-            local_path = os.path.join('amazon_images', image_filename)
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
-            print(f"Saved image locally to: {local_path}")
-            
-            # Upload to Dropbox
-            dropbox_path = f"/amazon_images/{image_filename}"
-            print(f"Uploading to Dropbox as: {dropbox_path}")
-            
-            with open(local_path, 'rb') as f:
-                self.dbx.files_upload(f.read(), dropbox_path)
-            print("Successfully uploaded file to Dropbox")
-            
-            # Get temporary direct link
-            try:
-                result = self.dbx.files_get_temporary_link(dropbox_path)
-                direct_link = result.link
-                print(f"Generated temporary direct link: {direct_link}")
-            except Exception as e:
-                print(f"Error getting temporary link: {str(e)}")
-                # Fallback to shared link if temporary link fails
-                shared_link = self.dbx.sharing_create_shared_link(dropbox_path)
-                direct_link = shared_link.url.replace('www.dropbox.com', 'dl.dropboxusercontent.com').replace('?dl=0', '?raw=1')
-                print(f"Fallback to shared link: {direct_link}")
-            
-            # Verify the image is accessible
-            verify_response = requests.head(direct_link, timeout=30)
-            verify_response.raise_for_status()
-            print("Verified image URL is accessible")
-            
-            # Clean up local file
-            os.remove(local_path)
-            print("Cleaned up local file")
-            
-            return direct_link, dropbox_path
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Error downloading or verifying image: {str(e)}")
-            raise Exception(f"Failed to download or verify image: {str(e)}")
-        except dropbox.exceptions.DropboxException as e:
-            print(f"Dropbox error: {str(e)}")
-            raise Exception(f"Failed to upload to Dropbox: {str(e)}")
-        except Exception as e:
-            print(f"Unexpected error in upload_to_dropbox: {str(e)}")
-            raise Exception(f"Failed to process image: {str(e)}")
-
     def post_to_ebay(self):
         if not self.product_data:
             QMessageBox.warning(self, "Error", "Please scrape a product first")
@@ -582,269 +595,93 @@ Product Details:
             QMessageBox.warning(self, "Error", "Please select a category")
             return
             
-        dropbox_path = None  # Store Dropbox path for cleanup
-        
         try:
-            # Load eBay credentials from config
-            with open('ebay.yaml', 'r') as f:
-                config = yaml.safe_load(f)
-            
-            # Verify required credentials are present
-            required_fields = ["appid", "devid", "certid", "token"]
-            missing_fields = [field for field in required_fields if field not in config]
-            if missing_fields:
-                raise Exception(f"Missing required eBay credentials in ebay.yaml: {', '.join(missing_fields)}")
-            
-            # Get and validate image URL
-            image_url = None
-            if "images" in self.product_data and self.product_data["images"]:
-                image_url = self.product_data["images"][0]
-                print(f"Found main image URL: {image_url}")
-            
-            if not image_url:
-                raise Exception("No image URL found in product data")
-            
-            # Upload image to Dropbox and get direct link
-            try:
-                hosted_image_url, dropbox_path = self.upload_to_dropbox(image_url)
-                print(f"Successfully got hosted image URL: {hosted_image_url}")
-                
-                # Verify the image URL is valid and accessible
-                verify_response = requests.head(hosted_image_url, timeout=30)
-                verify_response.raise_for_status()
-                print("Verified image URL is accessible")
-                
-                if not hosted_image_url.startswith('https://'):
-                    raise Exception("Invalid image URL format - must be HTTPS")
-                    
-                # XML encode the URL
-                hosted_image_url = escape(hosted_image_url)
-            except Exception as e:
-                raise Exception(f"Failed to process image: {str(e)}")
-            
-            if not hosted_image_url:
-                raise Exception("Failed to get hosted image URL")
-            
-            # Clean up and format the price
-            price = str(self.product_data["price"]).replace("$", "").replace(",", "").strip()
-            try:
-                # Convert to float and apply 15% discount
-                original_price = float(price)
-                discounted_price = original_price * 0.85  # 15% discount
-                price = "{:.2f}".format(discounted_price)
-                print(f"Original price: ${original_price:.2f}, Discounted price: ${price}")
-            except:
-                price = "99.99"  # Default price if parsing fails
-                print("Failed to parse price, using default price")
-            
-            # Extract shipping dimensions and weight from product details
-            dimensions = "12 x 12 x 12"  # Default dimensions
-            weight = 1  # Default weight in pounds
-            sku = ""  # Default empty SKU
-            
-            if "details" in self.product_data:
-                details = self.product_data["details"]
-                
-                # Extract dimensions
-                if "Product Dimensions" in details:
-                    dim_str = details["Product Dimensions"]
-                    # Extract numbers from string like "13.78 x 9.65 x 3.94 inches"
-                    import re
-                    numbers = re.findall(r'\d+\.?\d*', dim_str)
-                    if len(numbers) >= 3:
-                        dimensions = f"{numbers[0]} x {numbers[1]} x {numbers[2]}"
-                
-                # Extract weight
-                if "Product Dimensions" in details:
-                    weight_str = details["Product Dimensions"]
-                    # Extract weight from string like "3.44 Pounds"
-                    weight_match = re.search(r'(\d+\.?\d*)\s*Pounds?', weight_str)
-                    if weight_match:
-                        weight = int(float(weight_match.group(1)) + 0.5)  # Round up to nearest pound
-                
-                # Extract ASIN for SKU
-                if "ASIN" in details:
-                    sku = details["ASIN"]
-            
-            # Get required item specifics
-            required_specifics = self.category_selector.get_required_specifics()
-            
-            # Prepare item specifics
-            item_specifics_list = []
-            
-            # Add default specifics
-            default_specifics = {
-                "Brand": "Unbranded",
-                "Type": "Other"
-            }
-            
-            # Merge with required specifics
-            for name, values in required_specifics.items():
-                if name not in default_specifics:
-                    # If valid values are provided, use the first one, otherwise use "Unspecified"
-                    value = values[0] if values else "Unspecified"
-                    default_specifics[name] = value
-            
-            # Convert to XML format
-            for name, value in default_specifics.items():
-                item_specifics_list.append(f"""
-      <NameValueList>
-        <Name>{escape(name)}</Name>
-        <Value>{escape(value)}</Value>
-      </NameValueList>""")
-            
-            item_specifics_xml = "\n".join(item_specifics_list)
-            
-            # Prepare headers for eBay Trading API
-            headers = {
-                'X-EBAY-API-SITEID': '0',  # US site
-                'X-EBAY-API-COMPATIBILITY-LEVEL': '1399',  # Latest version
-                'X-EBAY-API-CALL-NAME': 'AddItem',
-                'X-EBAY-API-APP-NAME': config["appid"],
-                'X-EBAY-API-DEV-NAME': config["devid"],
-                'X-EBAY-API-CERT-NAME': config["certid"],
-                'Content-Type': 'text/xml'
-            }
-            
-            # Prepare AddItem XML request
-            # Escape special characters in title and description
-            title = escape(self.product_data["title"][:80])
-            description = escape(self.product_data["description"])
-            
-            xml_request = f"""<?xml version="1.0" encoding="utf-8"?>
-<AddItemRequest xmlns="urn:ebay:apis:eBLBaseComponents">
-  <RequesterCredentials>
-    <eBayAuthToken>{config["token"]}</eBayAuthToken>
-  </RequesterCredentials>
-  <ErrorLanguage>en_US</ErrorLanguage>
-  <WarningLevel>High</WarningLevel>
-  <Item>
-    <Title>{title}</Title>
-    <Description><![CDATA[{description}]]></Description>
-    <PrimaryCategory>
-      <CategoryID>{self.category_selector.get_selected_category_id()}</CategoryID>
-    </PrimaryCategory>
-    <StartPrice>{price}</StartPrice>
-    <CategoryMappingAllowed>true</CategoryMappingAllowed>
-    <ConditionID>1000</ConditionID>
-    <Country>US</Country>
-    <Currency>USD</Currency>
-    <ListingDuration>GTC</ListingDuration>
-    <ListingType>FixedPriceItem</ListingType>
-    <PictureDetails>
-      <GalleryType>Gallery</GalleryType>
-      <PictureURL>{hosted_image_url}</PictureURL>
-    </PictureDetails>
-    <PostalCode>95125</PostalCode>
-    <Quantity>1</Quantity>
-    <SKU>{sku}</SKU>
-    <ItemSpecifics>{item_specifics_xml}
-    </ItemSpecifics>
-    <ShippingPackageDetails>
-      <MeasurementUnit>English</MeasurementUnit>
-      <PackageDepth>{dimensions.split(' x ')[2]}</PackageDepth>
-      <PackageLength>{dimensions.split(' x ')[0]}</PackageLength>
-      <PackageWidth>{dimensions.split(' x ')[1]}</PackageWidth>
-      <ShippingPackage>PackageThickEnvelope</ShippingPackage>
-      <WeightMajor>{weight}</WeightMajor>
-      <WeightMinor>0</WeightMinor>
-    </ShippingPackageDetails>
-    <SellerProfiles>
-      <SellerPaymentProfile>
-        <PaymentProfileID>{config["payment_policy_id"]}</PaymentProfileID>
-      </SellerPaymentProfile>
-      <SellerReturnProfile>
-        <ReturnProfileID>{config["return_policy_id"]}</ReturnProfileID>
-      </SellerReturnProfile>
-      <SellerShippingProfile>
-        <ShippingProfileID>{config["fulfillment_policy_id"]}</ShippingProfileID>
-      </SellerShippingProfile>
-    </SellerProfiles>
-    <Site>US</Site>
-  </Item>
-</AddItemRequest>"""
-            
-            print("Sending request to eBay API...")
-            print(f"Headers: {str(headers)}")
-            print(f"XML Request: {xml_request}")
-            
-            # Make the API call
-            response = requests.post(
-                'https://api.ebay.com/ws/api.dll',
-                headers=headers,
-                data=xml_request.encode('utf-8')
+            # Credentials, policies and connection pool of the selected seller account
+            account = self.account
+            config = self.account_config()
+            if not account.spend():
+                QMessageBox.warning(self, "Error", f"Account {account.name} has used its "
+                                                   f"{account.daily_call_limit} eBay calls for today")
+                return
+            
+            item_id, price = lister.list_product(
+                config,
+                self.dbx,
+                self.product_data,
+                self.category_selector.get_selected_category_id(),
+                self.category_selector.get_required_specifics(),
+                session=account.session
             )
             
-            print(f"eBay API Response: {response.text}")
-            
-            # Parse the response
-            root = ET.fromstring(response.text)
-            
-            # Check for success
-            ack = root.find(".//Ack")
-            if ack is not None and ack.text == "Success":
-                # Clean up Dropbox file after successful listing
-                if dropbox_path:
-                    try:
-                        self.dbx.files_delete_v2(dropbox_path)
-                        print(f"Successfully deleted file from Dropbox: {dropbox_path}")
-                    except Exception as e:
-                        print(f"Warning: Failed to delete Dropbox file: {str(e)}")
-                
-                item_id = root.find(".//ItemID")
-                if item_id is not None:
-                    # Show success dialog with listing details
-                    dialog = ListingSuccessDialog(
-                        item_id=item_id.text,
-                        title=self.product_data["title"],
-                        price=price,
-                        parent=self
+            if item_id:
+                # Remember this category for the next product from the same Amazon browse node
+                try:
+                    lister.get_category_map().remember(
+                        self.product_data,
+                        self.category_selector.get_selected_category_id(),
+                        self.category_selector.get_selected_path(),
+                        self.category_selector.get_required_specifics()
                     )
-                    dialog.exec()
-                else:
-                    QMessageBox.information(self, "Success", "Item listed successfully!")
+                except Exception as e:
+                    logger.warning(f"Could not save category mapping: {str(e)}")
+
+                # Show success dialog with listing details
+                dialog = ListingSuccessDialog(
+                    item_id=item_id,
+                    title=self.product_data["title"],
+                    price=price,
+                    parent=self
+                )
+                dialog.exec()
             else:
-                # Get error messages
-                errors = root.findall(".//Errors")
-                error_messages = []
-                for error in errors:
-                    short_msg = error.find("ShortMessage")
-                    long_msg = error.find("LongMessage")
-                    if long_msg is not None:
-                        error_messages.append(long_msg.text)
-                    elif short_msg is not None:
-                        error_messages.append(short_msg.text)
-                
-                error_text = "\n".join(error_messages) if error_messages else "Unknown error occurred"
-                QMessageBox.critical(self, "Error", f"Failed to list item:\n{error_text}")
+                QMessageBox.information(self, "Success", "Item listed successfully!")
             
         except Exception as e:
+            logger.error(f"Error in post_to_ebay: {str(e)}")
             QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
-            print(f"Error in post_to_ebay: {str(e)}")
+        finally:
+            if self.accounts:
+                accounts.save_usage(self.accounts)
+            metrics.export_prometheus()
 
     def closeEvent(self, event):
-        if self.driver:
-            self.driver.quit()
+        if self.category_loader and self.category_loader.isRunning():
+            # Hide straight away; the download can't outlive its request timeouts
+            self.hide()
+            self.category_loader.categories_loaded.disconnect()
+            if not self.category_loader.wait(CATEGORY_LOADER_WAIT_MS):
+                logger.warning("Top-level category download still running at exit")
+        if self.browser:
+            self.browser.close()
+        metrics.export_prometheus()
         event.accept()
 
     def load_initial_categories(self):
-        """Load top-level categories into the first dropdown"""
+        """Load top-level categories into the first column"""
+        categories = load_category_cache()
+        if categories:
+            self.populate_initial_categories(categories, save=False)
+            return
+            
+        # No usable cache - download in the background and fill in when done
+        self.category_selector.set_loading()
+        self.category_loader = CategoryLoader(self.category_selector, self)
+        self.category_loader.categories_loaded.connect(self.populate_initial_categories)
+        self.category_loader.start()
+
+    def populate_initial_categories(self, categories, save=True):
+        """Fill the first column with top-level categories"""
         try:
-            response = self.category_selector.fetch_categories()
-            if response and 'rootCategoryNode' in response:
-                categories = response['rootCategoryNode'].get('childCategoryTreeNodes', [])
-                combo = self.category_selector.category_combos[0]
-                combo.clear()
+            self.category_selector.set_top_level(categories)
+
+            if categories and save:
+                save_category_cache(categories)
                 
-                for category in categories:
-                    cat_id = category['category']['categoryId']
-                    cat_name = category['category']['categoryName']
-                    combo.addItem(f"{cat_name} ({cat_id})")
-                    
         except Exception as e:
-            print(f"Error loading initial categories: {str(e)}")
+            logger.error(f"Error loading initial categories: {str(e)}")
 
 if __name__ == '__main__':
+    metrics.setup_logging()
     app = QApplication(sys.argv)
     window = AmazonEbayScraper()
     window.show()
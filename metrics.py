@@ -0,0 +1,215 @@
+"""Timing spans, counters and logging for the lister
+
+Every stage (scrape, upload, post) and every external call (Selenium
+navigation, Taxonomy/Trading/Dropbox requests) is wrapped in a span:
+
+    with metrics.span('taxonomy.get_category_subtree') as sp:
+        response = requests.get(...)
+        sp.add_bytes(received=len(response.content))
+
+Finished spans are appended to metrics/metrics.jsonl and aggregated into
+counters that export_prometheus() writes as metrics/metrics.prom.
+
+Environment variables:
+    AMZLISTER_LOG_LEVEL    DEBUG, INFO (default), WARNING, ERROR
+    AMZLISTER_METRICS_DIR  output directory (default "metrics"); set to an
+                           empty string to turn file export off
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('amzlister')
+
+METRICS_DIR = os.environ.get('AMZLISTER_METRICS_DIR', 'metrics')
+JSONL_FILE = 'metrics.jsonl'
+PROMETHEUS_FILE = 'metrics.prom'
+
+_lock = threading.Lock()
+_counters = {}  # (metric name, sorted label items) -> value
+_gauges = {}  # (metric name, sorted label items) -> latest value
+_span_stats = {}  # span name -> [count, total seconds, max seconds]
+_jsonl = None
+_listeners = []  # Callables that receive every finished Span
+
+def setup_logging(level=None):
+    """Configure the amzlister logger from AMZLISTER_LOG_LEVEL"""
+    level = level or os.environ.get('AMZLISTER_LOG_LEVEL', 'INFO')
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+
+def count(name, value=1, **labels):
+    """Add value to a counter, e.g. count('retries', call='dropbox.files_upload')"""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def gauge(name, value, **labels):
+    """Set a gauge to its latest value, e.g. gauge('browser_rss_bytes', rss)"""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _gauges[key] = value
+
+def _write_jsonl(record):
+    global _jsonl
+    if not METRICS_DIR:
+        return
+    with _lock:
+        if _jsonl is None:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            _jsonl = open(os.path.join(METRICS_DIR, JSONL_FILE), 'a', buffering=1)
+        _jsonl.write(json.dumps(record) + '\n')
+
+class Span:
+    """A timed section of work; use metrics.span() to create one"""
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.error = None
+        self.start = None
+        self.duration = None
+
+    def add_bytes(self, sent=0, received=0):
+        """Record payload sizes for this span"""
+        self.bytes_sent += sent
+        self.bytes_received += received
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc is not None:
+            self.error = type(exc).__name__
+        record_span(self)
+        return False
+
+def span(name, **labels):
+    """Time a block of work under the given span name"""
+    return Span(name, labels)
+
+def add_listener(listener):
+    """Call listener(span) for every finished span (used by the benchmarks)"""
+    _listeners.append(listener)
+
+def remove_listener(listener):
+    """Stop calling a listener added with add_listener()"""
+    _listeners.remove(listener)
+
+def record_span(sp):
+    """Fold a finished span into the counters and the JSON lines log"""
+    for listener in _listeners:
+        listener(sp)
+    with _lock:
+        stats = _span_stats.setdefault(sp.name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += sp.duration
+        stats[2] = max(stats[2], sp.duration)
+    if sp.bytes_sent:
+        count('bytes_sent', sp.bytes_sent, span=sp.name)
+    if sp.bytes_received:
+        count('bytes_received', sp.bytes_received, span=sp.name)
+    if sp.error:
+        count('errors', span=sp.name, error=sp.error)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("span %s took %.3fs%s", sp.name, sp.duration, f" ({sp.error})" if sp.error else "")
+
+    record = {
+        'ts': time.time(),
+        'span': sp.name,
+        'seconds': round(sp.duration, 6),
+    }
+    if sp.labels:
+        record['labels'] = sp.labels
+    if sp.bytes_sent:
+        record['bytes_sent'] = sp.bytes_sent
+    if sp.bytes_received:
+        record['bytes_received'] = sp.bytes_received
+    if sp.error:
+        record['error'] = sp.error
+    _write_jsonl(record)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+def prometheus_text():
+    """Render all spans and counters in the Prometheus text exposition format"""
+    with _lock:
+        span_stats = dict((name, list(stats)) for name, stats in _span_stats.items())
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+
+    lines = [
+        '# HELP amzlister_span_seconds Time spent in each stage or external call',
+        '# TYPE amzlister_span_seconds summary',
+    ]
+    for name, (n, total, _) in sorted(span_stats.items()):
+        lines.append(f'amzlister_span_seconds_count{{span="{name}"}} {n}')
+        lines.append(f'amzlister_span_seconds_sum{{span="{name}"}} {total:.6f}')
+    lines.append('# HELP amzlister_span_max_seconds Slowest observed run of each span')
+    lines.append('# TYPE amzlister_span_max_seconds gauge')
+    for name, (_, _, longest) in sorted(span_stats.items()):
+        lines.append(f'amzlister_span_max_seconds{{span="{name}"}} {longest:.6f}')
+
+    seen = set()
+    for (name, labels), value in sorted(counters.items()):
+        metric = f'amzlister_{name}_total'
+        if metric not in seen:
+            lines.append(f'# TYPE {metric} counter')
+            seen.add(metric)
+        lines.append(f'{metric}{_format_labels(labels)} {value}')
+
+    seen = set()
+    for (name, labels), value in sorted(gauges.items()):
+        metric = f'amzlister_{name}'
+        if metric not in seen:
+            lines.append(f'# TYPE {metric} gauge')
+            seen.add(metric)
+        lines.append(f'{metric}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+def export_prometheus(path=None):
+    """Write the Prometheus text file (atomically, for node_exporter's textfile collector)"""
+    if path is None:
+        if not METRICS_DIR:
+            return None
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, PROMETHEUS_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+    return path
+
+def snapshot():
+    """Return span stats and counters as plain dicts (used by the benchmarks)"""
+    with _lock:
+        return {
+            'spans': {name: {'count': s[0], 'seconds': s[1], 'max': s[2]} for name, s in _span_stats.items()},
+            'counters': {(name + _format_labels(labels)): value for (name, labels), value in _counters.items()},
+            'gauges': {(name + _format_labels(labels)): value for (name, labels), value in _gauges.items()},
+        }
+
+def reset():
+    """Clear all collected spans and counters"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _span_stats.clear()
@@ -0,0 +1,246 @@
+"""Price and stock monitor for listed Amazon products
+
+Re-checks every active ASIN in the ledger on an adaptive schedule:
+products that keep changing are checked more often, stable ones less often,
+so a limited scraping budget goes to the volatile items. Pages are fetched
+with a plain HTTP request first and only fall back to Chrome if Amazon
+serves something we can't parse.
+
+Each check fingerprints price, availability and the image set; only real
+changes are emitted (to monitor_changes.jsonl) and written back to the
+listings, so repricer.py can push them to eBay.
+
+Usage:
+    python monitor.py --once [--budget 200] [--reprice]
+    python monitor.py [--budget 200]        # keep running
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import requests
+import archive
+import lister
+import metrics
+from browser import BrowserGovernor
+from metrics import logger
+
+STATE_FILE = 'monitor_state.json'
+CHANGES_FILE = 'monitor_changes.jsonl'
+
+AMAZON_PRODUCT_URL = 'https://www.amazon.com/dp/{asin}'
+
+INITIAL_INTERVAL = 6 * 60 * 60
+MIN_INTERVAL = 60 * 60
+MAX_INTERVAL = 7 * 24 * 60 * 60
+SPEEDUP = 0.5  # Interval multiplier after a change
+BACKOFF = 1.5  # Interval multiplier after an unchanged check
+
+REQUEST_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'),
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+def in_stock(availability):
+    """Best-effort reading of Amazon's availability text"""
+    text = (availability or "").lower()
+    if not text:
+        return True  # Amazon often omits the block for normal in-stock items
+    return not any(phrase in text for phrase in ("unavailable", "out of stock", "no longer available"))
+
+def watched_fields(product):
+    """The fields that matter for a listing, normalized for comparison"""
+    return {
+        "price": lister.parse_price(product.get("price")),
+        "in_stock": in_stock(product.get("availability")),
+        "images": sorted(product.get("images", [])),
+    }
+
+def fingerprint(fields):
+    """Stable hash of the watched fields"""
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+class Monitor:
+    """Adaptive re-check scheduler for listed ASINs"""
+
+    def __init__(self, state_file=STATE_FILE, changes_file=CHANGES_FILE, url_template=AMAZON_PRODUCT_URL,
+                 use_browser=True):
+        self.state_file = state_file
+        self.changes_file = changes_file
+        self.url_template = url_template
+        self.use_browser = use_browser
+        self.session = requests.Session()
+        self.session.headers.update(REQUEST_HEADERS)
+        self.browser = None
+        self.state = self.load_state()
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_file)
+
+    def sync_asins(self, asins):
+        """Start tracking new ASINs (due immediately) and drop delisted ones"""
+        now = time.time()
+        for asin in asins:
+            self.state.setdefault(asin, {
+                "interval": INITIAL_INTERVAL,
+                "next_check": now,
+                "fingerprint": None,
+                "fields": None,
+                "checks": 0,
+                "changes": 0,
+            })
+        for asin in set(self.state) - set(asins):
+            del self.state[asin]
+
+    def due(self, now=None, budget=None):
+        """ASINs whose next check has passed, most overdue first, capped at budget"""
+        now = now or time.time()
+        ready = sorted((entry["next_check"], asin) for asin, entry in self.state.items() if entry["next_check"] <= now)
+        asins = [asin for _, asin in ready]
+        return asins[:budget] if budget else asins
+
+    def fetch(self, asin):
+        """Get product fields the cheapest way that works: HTTP first, then Chrome"""
+        url = self.url_template.format(asin=asin)
+        try:
+            with metrics.span('monitor.http_get') as sp:
+                response = self.session.get(url, timeout=20)
+                sp.add_bytes(received=len(response.content))
+            if response.status_code == 200:
+                product = lister.parse_product_html(response.text)
+                if product is not None:
+                    metrics.count('monitor_checks', path='http')
+                    archive.archive_page(asin, response.text, url, 'http')
+                    return product
+            logger.debug(f"HTTP check for {asin} unusable (status {response.status_code}), trying browser")
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"HTTP check for {asin} failed: {str(e)}")
+
+        if not self.use_browser:
+            raise Exception(f"Could not fetch {asin} over HTTP")
+        if self.browser is None:
+            self.browser = BrowserGovernor()
+        metrics.count('monitor_checks', path='selenium')
+        return self.browser.scrape(url)
+
+    def check(self, asin, now=None):
+        """Re-check one ASIN; return a change event dict, or None if nothing changed"""
+        entry = self.state[asin]
+        fields = watched_fields(self.fetch(asin))
+        digest = fingerprint(fields)
+        now = now or time.time()
+
+        entry["checks"] += 1
+        event = None
+        if entry["fingerprint"] is not None and digest != entry["fingerprint"]:
+            previous = entry["fields"] or {}
+            event = {
+                "asin": asin,
+                "ts": now,
+                "changed": sorted(key for key in fields if fields[key] != previous.get(key)),
+                "before": previous,
+                "after": fields,
+            }
+            entry["changes"] += 1
+            entry["interval"] = max(MIN_INTERVAL, entry["interval"] * SPEEDUP)
+        elif entry["fingerprint"] is not None:
+            entry["interval"] = min(MAX_INTERVAL, entry["interval"] * BACKOFF)
+
+        entry["fingerprint"] = digest
+        entry["fields"] = fields
+        entry["last_check"] = now
+        entry["next_check"] = now + entry["interval"]
+        return event
+
+    def run_once(self, budget=None):
+        """Check everything that's due (up to budget) and return the change events"""
+        events = []
+        for asin in self.due(budget=budget):
+            try:
+                event = self.check(asin)
+            except Exception as e:
+                logger.warning(f"Check failed for {asin}: {str(e)}")
+                metrics.count('errors', span='monitor.check', error=type(e).__name__)
+                # Try again later without resetting its interval
+                self.state[asin]["next_check"] = time.time() + MIN_INTERVAL
+                continue
+            if event:
+                events.append(event)
+        metrics.count('monitor_changes', len(events))
+        self.save_state()
+        if events:
+            with open(self.changes_file, 'a') as f:
+                for event in events:
+                    f.write(json.dumps(event) + '\n')
+        return events
+
+    def next_due(self):
+        """Timestamp of the earliest scheduled check"""
+        return min((entry["next_check"] for entry in self.state.values()), default=None)
+
+    def close(self):
+        if self.browser is not None:
+            self.browser.close()
+            self.browser = None
+
+def apply_events(listings, events):
+    """Copy new Amazon prices and stock into the listing entries; return the entries changed"""
+    by_asin = {entry.get("asin"): entry for entry in listings}
+    updated = []
+    for event in events:
+        entry = by_asin.get(event["asin"])
+        if entry is None:
+            continue
+        after = event["after"]
+        if after["price"] is not None:
+            entry["amazon_price"] = after["price"]
+        entry["target_quantity"] = 1 if after["in_stock"] else 0
+        updated.append(entry)
+    return updated
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-check listed Amazon products for price and stock changes")
+    parser.add_argument('--once', action='store_true', help="Check what's due, then exit")
+    parser.add_argument('--budget', type=int, default=None, help="Maximum pages to fetch per round")
+    parser.add_argument('--reprice', action='store_true', help="Push changes to eBay with repricer.py")
+    parser.add_argument('--no-browser', action='store_true', help="Never fall back to Chrome")
+    args = parser.parse_args()
+
+    metrics.setup_logging()
+    monitor = Monitor(use_browser=not args.no_browser)
+    try:
+        while True:
+            listings = lister.load_listings()
+            monitor.sync_asins([entry["asin"] for entry in listings if entry.get("asin")])
+            events = monitor.run_once(args.budget)
+            updated = apply_events(listings, events)
+            if updated:
+                if args.reprice:
+                    import repricer
+                    repricer.reprice_accounts(lister.load_config(), updated)
+                lister.save_listings(updated)
+            logger.info(f"Checked due products, {len(events)} changed")
+            metrics.export_prometheus()
+
+            if args.once:
+                break
+            next_due = monitor.next_due()
+            time.sleep(max(60, (next_due or time.time() + MIN_INTERVAL) - time.time()))
+    finally:
+        monitor.close()
+
+if __name__ == '__main__':
+    main()
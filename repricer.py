@@ -0,0 +1,202 @@
+"""Bulk repricing and inventory sync for existing listings
+
+Recomputes eBay prices for the whole catalog at once from the stored Amazon
+prices and the markdown rule, then pushes only the listings whose price or
+quantity changed through ReviseInventoryStatus, four items per call.
+Active listings are read from the ledger; an entry's "target_quantity"
+(e.g. 0 when Amazon is out of stock) is synced as well.
+
+Usage:
+    python repricer.py [--dry-run] [--markdown 0.85] [--workers 8]
+    python repricer.py --catalog products.parquet   # take Amazon prices from a catalog file
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+from xml.sax.saxutils import escape
+import lister
+import metrics
+from metrics import logger
+
+REVISE_BATCH_SIZE = 4  # ReviseInventoryStatus accepts at most four InventoryStatus containers
+DEFAULT_WORKERS = 8
+
+def catalog_arrays(listings):
+    """Column arrays for a list of listing entries"""
+    return {
+        "item_id": np.array([entry["item_id"] for entry in listings], dtype=object),
+        "sku": np.array([entry.get("sku", "") for entry in listings], dtype=object),
+        "amazon_price": np.array([entry.get("amazon_price") for entry in listings], dtype=np.float64),
+        "price": np.array([entry.get("price") for entry in listings], dtype=np.float64),
+        "quantity": np.array([entry.get("quantity", 1) for entry in listings], dtype=np.int64),
+        "target_quantity": np.array([entry.get("target_quantity", entry.get("quantity", 1)) for entry in listings],
+                                    dtype=np.int64),
+    }
+
+def compute_prices(amazon_prices, current_prices, markdown=lister.PRICE_MARKDOWN):
+    """Apply the markdown rule to every Amazon price; unknown Amazon prices keep their current price"""
+    new_prices = np.round(amazon_prices * markdown, 2)
+    unknown = ~np.isfinite(new_prices) | (new_prices <= 0)
+    return np.where(unknown, current_prices, new_prices)
+
+def changed_indexes(columns, new_prices):
+    """Indexes of listings whose price or quantity needs to be revised"""
+    price_changed = np.abs(new_prices - np.nan_to_num(columns["price"], nan=-1.0)) >= 0.005
+    quantity_changed = columns["target_quantity"] != columns["quantity"]
+    return np.flatnonzero(price_changed | quantity_changed)
+
+def build_revise_xml(config, updates):
+    """ReviseInventoryStatus request for up to four (item ID, price, quantity) updates"""
+    statuses = "".join(f"""
+  <InventoryStatus>
+    <ItemID>{escape(str(item_id))}</ItemID>
+    <StartPrice>{price:.2f}</StartPrice>
+    <Quantity>{quantity}</Quantity>
+  </InventoryStatus>""" for item_id, price, quantity in updates)
+
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<ReviseInventoryStatusRequest xmlns="urn:ebay:apis:eBLBaseComponents">
+  <RequesterCredentials>
+    <eBayAuthToken>{config["token"]}</eBayAuthToken>
+  </RequesterCredentials>
+  <ErrorLanguage>en_US</ErrorLanguage>
+  <WarningLevel>High</WarningLevel>{statuses}
+</ReviseInventoryStatusRequest>"""
+
+def revise_batch(config, updates, session=None, account=None):
+    """Send one ReviseInventoryStatus call; return the set of ItemIDs eBay accepted
+
+    The call is charged to account's daily budget, if given; returns None
+    without calling eBay when the budget is spent.
+    """
+    if account is not None and not account.spend():
+        return None
+    try:
+        root = lister.trading_call(config, 'ReviseInventoryStatus', build_revise_xml(config, updates), session)
+    except Exception as e:
+        logger.error(f"ReviseInventoryStatus failed: {str(e)}")
+        metrics.count('errors', span='trading.ReviseInventoryStatus', error=type(e).__name__)
+        return set()
+
+    accepted = {status.findtext("ItemID") for status in root.findall(".//InventoryStatus")}
+    if not lister.trading_succeeded(root):
+        # A failed call can still have revised some items; only trust the ones echoed back
+        messages = lister.trading_errors(root)
+        logger.warning(f"ReviseInventoryStatus problems: {'; '.join(messages) or 'Unknown error'}")
+        metrics.count('errors', span='trading.ReviseInventoryStatus', error='Failure')
+    return accepted
+
+def reprice(config, listings, markdown=lister.PRICE_MARKDOWN, workers=DEFAULT_WORKERS, dry_run=False,
+            account=None):
+    """Revise every listing whose computed price or quantity differs from eBay's
+
+    Updates the entries in place for items eBay accepted and returns
+    (number of changed items, number revised). Calls are charged to
+    account (from accounts.py), if given.
+    """
+    if not listings:
+        return 0, 0
+
+    columns = catalog_arrays(listings)
+    with metrics.span('reprice.compute'):
+        new_prices = compute_prices(columns["amazon_price"], columns["price"], markdown)
+        changed = changed_indexes(columns, new_prices)
+    logger.info(f"{len(changed)} of {len(listings)} listings need revising")
+
+    if dry_run or not len(changed):
+        return len(changed), 0
+
+    updates = [
+        (columns["item_id"][i], float(new_prices[i]), int(columns["target_quantity"][i]))
+        for i in changed
+    ]
+    batches = [updates[i:i + REVISE_BATCH_SIZE] for i in range(0, len(updates), REVISE_BATCH_SIZE)]
+
+    # Share one session sized for all workers so TLS connections are reused between batches
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    with metrics.span('reprice.revise'), ThreadPoolExecutor(max_workers=workers) as pool:
+        accepted = set()
+        over_budget = 0
+        for batch_accepted in pool.map(lambda batch: revise_batch(config, batch, session, account), batches):
+            if batch_accepted is None:
+                over_budget += 1
+            else:
+                accepted |= batch_accepted
+    if over_budget:
+        logger.warning(f"Account {account.name} has used its {account.daily_call_limit} calls for today; "
+                       f"{over_budget} ReviseInventoryStatus calls skipped")
+
+    by_item = {entry["item_id"]: entry for entry in listings}
+    for item_id, price, quantity in updates:
+        if item_id in accepted:
+            by_item[item_id]["price"] = price
+            by_item[item_id]["quantity"] = quantity
+    metrics.count('items_revised', len(accepted))
+    return len(changed), len(accepted)
+
+def reprice_accounts(config, listings, markdown=lister.PRICE_MARKDOWN, workers=DEFAULT_WORKERS, dry_run=False):
+    """reprice() each seller account's listings with that account's token; returns summed counts"""
+    import accounts
+
+    accounts_list = accounts.load_accounts(config)
+    groups = {}
+    for entry in listings:
+        account = accounts.find_account(accounts_list, entry.get("account"))
+        if account is None:
+            logger.warning(f"Listing {entry['item_id']} is on unknown account {entry.get('account')}; skipped")
+            continue
+        groups.setdefault(account.name, (account, []))[1].append(entry)
+
+    changed = revised = 0
+    try:
+        for account, group in groups.values():
+            account.ensure_token()
+            account_changed, account_revised = reprice(account.config, group, markdown, workers, dry_run, account)
+            changed += account_changed
+            revised += account_revised
+    finally:
+        if not dry_run:
+            accounts.save_usage(accounts_list)
+    return changed, revised
+
+def apply_catalog_prices(listings, path):
+    """Update Amazon prices in the listing entries from a catalog file; return how many matched"""
+    import catalog
+
+    data = catalog.read_columns(path, ['asin', 'price'])
+    amazon_prices = dict(zip(data['asin'], data['price']))
+    matched = 0
+    for entry in listings:
+        price = lister.parse_price(amazon_prices.get(entry.get("asin")))
+        if price is not None:
+            entry["amazon_price"] = price
+            matched += 1
+    return matched
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprice all listings from stored Amazon prices")
+    parser.add_argument('--markdown', type=float, default=lister.PRICE_MARKDOWN,
+                        help="eBay price as a fraction of the Amazon price")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Concurrent Trading API calls")
+    parser.add_argument('--dry-run', action='store_true', help="Only report how many listings would change")
+    parser.add_argument('--catalog', help="Catalog file (see catalog.py) with fresh Amazon prices")
+    args = parser.parse_args()
+
+    metrics.setup_logging()
+    config = lister.load_config()
+    listings = lister.load_listings()
+    if args.catalog:
+        logger.info(f"{apply_catalog_prices(listings, args.catalog)} listings matched products in {args.catalog}")
+    changed, revised = reprice_accounts(config, listings, args.markdown, args.workers, args.dry_run)
+    if revised:
+        lister.save_listings(listings)
+    print(f"{changed} listings changed, {revised} revised")
+    metrics.export_prometheus()
+
+if __name__ == '__main__':
+    main()